@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/4.0/ref/settings/
 import os
 import sys
 from pathlib import Path
+from datetime import timedelta
 from celery.schedules import crontab
 
 import sentry_sdk
@@ -251,6 +252,131 @@ CELERY_COMMAND = (
 CELERY_AUTORELOAD = DEBUG
 CELERY_ALWAYS_EAGER = TEST
 CELERY_TIMEZONE = TIME_ZONE
+# Crawls are slow and bursty, they get a queue of their own so email and
+# search indexing never wait behind them. Dispatchers and housekeeping go
+# to maintenance, anything unrouted to the default queue. Workers are
+# started per queue by manage.py celery --queues, which takes concurrency
+# and prefetch defaults from CELERY_WORKER_QUEUES.
+CELERY_TASK_DEFAULT_QUEUE = 'celery'
+CELERY_TASK_ROUTES = {
+    'rest.tasks.video.update_channel': {'queue': 'crawl'},
+    'rest.tasks.video.update_channels': {'queue': 'maintenance'},
+    'rest.tasks.video.crawl_due_channels': {'queue': 'maintenance'},
+    'rest.tasks.video.update_channels_random': {'queue': 'maintenance'},
+    'rest.tasks.video.prune_metadata': {'queue': 'maintenance'},
+    'rest.tasks.video.prune_crawls': {'queue': 'maintenance'},
+    'rest.tasks.search.index_search_terms': {'queue': 'index'},
+    'rest.tasks.search.compact_terms': {'queue': 'maintenance'},
+    'rest.tasks.search.rebuild_search_terms': {'queue': 'maintenance'},
+    'rest.tasks.counters.reconcile_counters': {'queue': 'maintenance'},
+    'djcelery_email_send_multiple': {'queue': 'email'},
+}
+CELERY_WORKER_QUEUES = {
+    'crawl': {
+        'concurrency': int(os.getenv('CELERY_CRAWL_CONCURRENCY', '8')),
+        'prefetch': 1,
+    },
+    'index': {
+        'concurrency': int(os.getenv('CELERY_INDEX_CONCURRENCY', '1')),
+        'prefetch': 1,
+    },
+    'email': {
+        'concurrency': int(os.getenv('CELERY_EMAIL_CONCURRENCY', '2')),
+        'prefetch': 4,
+    },
+    'maintenance': {
+        'concurrency': int(os.getenv('CELERY_MAINTENANCE_CONCURRENCY', '1')),
+        'prefetch': 1,
+    },
+    'celery': {
+        'concurrency': int(os.getenv('CELERY_DEFAULT_CONCURRENCY', '2')),
+        'prefetch': 4,
+    },
+}
+
+# Number of crawled videos written per batch, 0 saves them one at a time.
+CRAWL_BATCH_SIZE = int(os.getenv('DJANGO_CRAWL_BATCH_SIZE', '100'))
+# Max crawls running at once, overall and per video host.
+CRAWL_CONCURRENCY = int(os.getenv('DJANGO_CRAWL_CONCURRENCY', '8'))
+CRAWL_HOST_CONCURRENCY = int(os.getenv('DJANGO_CRAWL_HOST_CONCURRENCY', '2'))
+# Channels claimed per beat tick, and how crawl intervals adapt to the
+# channel's publish cadence (see rest.models.get_crawl_interval).
+CRAWL_DUE_LIMIT = int(os.getenv('DJANGO_CRAWL_DUE_LIMIT', '100'))
+CRAWL_CADENCE_SAMPLE = 10
+CRAWL_INTERVAL_FACTOR = 0.5
+CRAWL_INTERVAL_MIN = timedelta(
+    minutes=int(os.getenv('DJANGO_CRAWL_INTERVAL_MIN', '15')))
+CRAWL_INTERVAL_MAX = timedelta(
+    minutes=int(os.getenv('DJANGO_CRAWL_INTERVAL_MAX', '1440')))
+# How long a crawl holds its channel lease without renewing it, so the
+# lease lapses if the worker dies mid-crawl.
+CRAWL_LEASE_TTL = timedelta(
+    seconds=int(os.getenv('DJANGO_CRAWL_LEASE_TTL', '600')))
+# Crawler state is written at most every this many seconds or state updates,
+# and always when the crawl ends.
+CRAWL_CHECKPOINT_INTERVAL = int(
+    os.getenv('DJANGO_CRAWL_CHECKPOINT_INTERVAL', '30'))
+CRAWL_CHECKPOINT_PAGES = int(os.getenv('DJANGO_CRAWL_CHECKPOINT_PAGES', '10'))
+# Failed crawls are retried after an exponential backoff with jitter
+# (see rest.breaker.backoff). Failures of this many channels of a host within
+# the window short-circuit crawls of that host for the cooldown.
+CRAWL_RETRY_BACKOFF = timedelta(
+    seconds=int(os.getenv('DJANGO_CRAWL_RETRY_BACKOFF', '30')))
+CRAWL_RETRY_BACKOFF_MAX = timedelta(
+    seconds=int(os.getenv('DJANGO_CRAWL_RETRY_BACKOFF_MAX', '1800')))
+CRAWL_BREAKER_THRESHOLD = int(os.getenv('DJANGO_CRAWL_BREAKER_THRESHOLD', '5'))
+CRAWL_BREAKER_WINDOW = timedelta(
+    seconds=int(os.getenv('DJANGO_CRAWL_BREAKER_WINDOW', '600')))
+CRAWL_BREAKER_COOLDOWN = timedelta(
+    seconds=int(os.getenv('DJANGO_CRAWL_BREAKER_COOLDOWN', '900')))
+# The first crawl of a channel without videos is loaded through COPY
+# staging tables (see rest.backfill), this many videos per COPY.
+CRAWL_BACKFILL = os.getenv('DJANGO_CRAWL_BACKFILL', 'true').lower() in (
+    'on', 'true', 'yes')
+CRAWL_BACKFILL_COPY_SIZE = int(
+    os.getenv('DJANGO_CRAWL_BACKFILL_COPY_SIZE', '1000'))
+# Per crawl telemetry (rest.models.Crawl) is kept this long. The metrics
+# endpoint reports crawls started within the window and requires
+# METRICS_TOKEN as a bearer token, it is disabled without one.
+CRAWL_STATS_RETENTION = timedelta(
+    days=int(os.getenv('DJANGO_CRAWL_STATS_RETENTION', '30')))
+CRAWL_METRICS_WINDOW = timedelta(
+    minutes=int(os.getenv('DJANGO_CRAWL_METRICS_WINDOW', '60')))
+CRAWL_METRICS_SLOWEST = int(os.getenv('DJANGO_CRAWL_METRICS_SLOWEST', '10'))
+METRICS_TOKEN = get_from_env_or_file('DJANGO_METRICS_TOKEN', None)
+
+# Objects indexed per search term batch, and how the batch's texts are
+# split across spaCy worker processes (see rest.tasks.search).
+SEARCH_INDEX_BATCH_SIZE = int(
+    os.getenv('DJANGO_SEARCH_INDEX_BATCH_SIZE', '500'))
+SEARCH_NLP_PROCESSES = int(os.getenv('DJANGO_SEARCH_NLP_PROCESSES', '1'))
+SEARCH_NLP_BATCH_SIZE = int(os.getenv('DJANGO_SEARCH_NLP_BATCH_SIZE', '64'))
+# Search term extractor backend, rest.extractors.RegexExtractor skips the
+# spaCy model entirely. Options are passed to the backend's constructor.
+SEARCH_EXTRACTOR = os.getenv(
+    'DJANGO_SEARCH_EXTRACTOR', 'rest.extractors.SpacyExtractor')
+SEARCH_EXTRACTOR_OPTIONS = {}
+# Terms occurring fewer times than this are pruned by compact_terms.
+SEARCH_TERM_MIN_FREQ = int(os.getenv('DJANGO_SEARCH_TERM_MIN_FREQ', '1'))
+# Rows recounted per statement by reconcile_counters.
+COUNTER_RECONCILE_BATCH_SIZE = int(
+    os.getenv('DJANGO_COUNTER_RECONCILE_BATCH_SIZE', '1000'))
+# How long a user's cached set of visible channels lives in Redis, and how
+# many sets each process keeps in memory in front of it.
+ENTITLEMENTS_CACHE_TTL = timedelta(
+    minutes=int(os.getenv('DJANGO_ENTITLEMENTS_CACHE_TTL', '10')))
+ENTITLEMENTS_LOCAL_SIZE = int(
+    os.getenv('DJANGO_ENTITLEMENTS_LOCAL_SIZE', '1024'))
+# Anonymous listing responses are cached for LISTING_CACHE_TTL, and served
+# for up to LISTING_CACHE_GRACE longer while one request rebuilds them.
+# Requests arriving meanwhile without a copy wait for the rebuild at most
+# LISTING_CACHE_LOCK_TIMEOUT.
+LISTING_CACHE_TTL = timedelta(
+    seconds=int(os.getenv('DJANGO_LISTING_CACHE_TTL', '60')))
+LISTING_CACHE_GRACE = timedelta(
+    seconds=int(os.getenv('DJANGO_LISTING_CACHE_GRACE', '300')))
+LISTING_CACHE_LOCK_TIMEOUT = timedelta(
+    seconds=int(os.getenv('DJANGO_LISTING_CACHE_LOCK_TIMEOUT', '5')))
 
 
 REST_FRAMEWORK = {
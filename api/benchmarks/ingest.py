@@ -0,0 +1,226 @@
+"""
+Measure ingestion throughput of the real update_channel task, with
+videosrc.crawl_sync replaced by an offline stand-in that generates
+channels of realistic videos.
+
+Usage (from the api directory, needs the database):
+
+    python3 -m benchmarks.ingest [--channels N] [--videos M] [--passes N]
+                                 [--changed F] [--batch-size N]
+                                 [--no-backfill] [--redis-db N]
+
+Runs against a throwaway test database, like manage.py test, and a
+separate Redis database (--redis-db) that is flushed afterwards. The
+first pass crawls new channels, later passes recrawl them with a
+fraction (--changed) of the videos modified. Each pass reports videos/s, SQL
+queries per video and peak RSS. COPY statements are not counted as
+queries.
+"""
+import argparse
+import os
+import random
+import resource
+import time
+
+from datetime import datetime, timedelta
+from unittest import mock
+
+import django
+
+from tests.fixtures import ChannelData, VideoData, VideoSourceData
+
+
+WORDS = '''
+linux server build review guide news live episode history science music
+kitchen garden travel budget gaming election privacy python keyboard rover
+economy interview debate tutorial beginner restoration weekly roundup
+workshop camera drone football market energy climate space ocean mountain
+'''.split()
+TAGS = [f'{a} {b}' for a in WORDS[:16] for b in WORDS[16:32]][:200]
+RESOLUTIONS = ((426, 240), (640, 360), (854, 480), (1280, 720), (1920, 1080))
+PAGE_SIZE = 50
+
+
+class FakeSource:
+    """
+    Stands in for videosrc.crawl_sync(). Each channel yields the same
+    videos on every pass, except that a fraction of them get a new title.
+    """
+    def __init__(self, n_videos, changed=0.0, seed=0):
+        self.n_videos = n_videos
+        self.changed = changed
+        self.seed = seed
+        self.passes = {}
+
+    def sentence(self, rng, n):
+        return ' '.join(rng.choice(WORDS) for _ in range(n)).capitalize()
+
+    def video(self, rng, channel_id, i, revision):
+        extern_id = f'bench-{channel_id}-{i}'
+        sources = [
+            VideoSourceData(
+                extern_id=f'{extern_id}-{height}',
+                url=f'https://cdn.example.com/{extern_id}/{height}.mp4',
+                width=width, height=height, fps=30,
+                size=rng.randint(10 ** 6, 10 ** 9), mime='video/mp4',
+                original={'format_id': f'{height}p', 'vcodec': 'avc1',
+                          'acodec': 'mp4a', 'tbr': rng.random() * 5000})
+            for width, height in rng.sample(RESOLUTIONS, rng.randint(2, 4))
+        ]
+        title = self.sentence(rng, rng.randint(4, 10))
+        if revision:
+            title = f'{title} (updated {revision})'
+        description = '\n\n'.join(
+            self.sentence(rng, rng.randint(10, 30)) + '.'
+            for _ in range(rng.randint(1, 5)))
+        published = datetime(2020, 1, 1) + timedelta(hours=i)
+        return VideoData(
+            extern_id=extern_id,
+            title=title[:256],
+            description=description,
+            poster=f'https://cdn.example.com/{extern_id}/poster.jpg',
+            duration=rng.randint(30, 3 * 3600),
+            published=published,
+            tags=rng.sample(TAGS, rng.randint(2, 8)),
+            sources=sources,
+            original={
+                'id': extern_id,
+                'title': title,
+                'description': description,
+                'uploader': f'channel {channel_id}',
+                'view_count': rng.randint(0, 10 ** 6),
+                'like_count': rng.randint(0, 10 ** 4),
+                'timestamp': published.timestamp(),
+                'thumbnails': [
+                    {'url': f'https://cdn.example.com/{extern_id}/{n}.jpg'}
+                    for n in range(3)
+                ],
+            },
+        )
+
+    def videos(self, channel_id, revision, save_state):
+        for i in range(self.n_videos):
+            if i and i % PAGE_SIZE == 0 and save_state:
+                save_state({'page': i // PAGE_SIZE, 'seen': i})
+
+            rng = random.Random(f'{self.seed}-{channel_id}-{i}')
+            # NOTE: always drawn, so every pass generates the same videos.
+            changed = rng.random() < self.changed
+            yield self.video(rng, channel_id, i, revision if changed else 0)
+
+    def __call__(self, url, state=None, save_state=None, **kwargs):
+        channel_id = url.rsplit('/', 1)[-1]
+        revision = self.passes.get(url, 0)
+        self.passes[url] = revision + 1
+
+        channel = ChannelData(
+            extern_id=f'bench-{channel_id}', name=f'bench {channel_id}',
+            title=f'Benchmark channel {channel_id}',
+            description='Generated by benchmarks.ingest',
+            original={'id': channel_id, 'videos': self.n_videos})
+        return channel, self.videos(channel_id, revision, save_state)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def max_rss():
+    # NOTE: ru_maxrss is in KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def redis_caches(db):
+    from django.conf import settings
+
+    location = f'redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}/{db}'
+    return {
+        'default': {**settings.CACHES['default'], 'LOCATION': location},
+    }
+
+
+def run(args):
+    from django.db import connection
+    from django.test import override_settings
+    from django_redis import get_redis_connection
+
+    from rest.models import User, Channel
+    from rest.tasks.video import update_channel
+
+    user = User.objects.create(
+        username='benchmark', email='benchmark@example.com', site_id=1)
+    channels = [
+        Channel.objects.create(
+            user=user, extern_id=f'bench-{i}', name=f'bench {i}',
+            url=f'https://videos.example.com/c/{i}')
+        for i in range(args.channels)
+    ]
+    source = FakeSource(args.videos, changed=args.changed, seed=args.seed)
+    n_videos = args.channels * args.videos
+    print(f'channels: {args.channels}, videos per channel: {args.videos}, '
+          f'batch size: {args.batch_size}, backfill: {args.backfill}')
+
+    # NOTE: leases, breakers and caches live in Redis, keep them apart from
+    # the ones of a running site.
+    overrides = override_settings(
+        CRAWL_BATCH_SIZE=args.batch_size, CRAWL_BACKFILL=args.backfill,
+        CACHES=redis_caches(args.redis_db))
+    with overrides, mock.patch('rest.tasks.video.crawl_sync', source):
+        try:
+            for n in range(args.passes):
+                counter = QueryCounter()
+                start = time.perf_counter()
+                with connection.execute_wrapper(counter):
+                    for channel in channels:
+                        update_channel(channel.id)
+                elapsed = time.perf_counter() - start
+
+                label = 'crawl' if n == 0 else f'recrawl {n}'
+                print(f'\n{label}: {elapsed:.2f}s, '
+                      f'{n_videos / elapsed:.0f} videos/s, '
+                      f'{counter.count / n_videos:.2f} queries/video, '
+                      f'peak rss {max_rss():.1f}MiB')
+
+        finally:
+            get_redis_connection('default').flushdb()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--channels', type=int, default=4)
+    parser.add_argument('--videos', type=int, default=1000)
+    parser.add_argument('--passes', type=int, default=2)
+    parser.add_argument('--changed', type=float, default=0.1)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--no-backfill', dest='backfill',
+                        action='store_false')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--redis-db', type=int, default=15)
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api.settings')
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import (
+        setup_test_environment, teardown_test_environment,
+    )
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        run(args)
+
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Compare search term extractor backends on a fixed corpus of video titles
+and descriptions: throughput, and how the resulting terms differ.
+
+Usage (from the api directory):
+
+    python3 -m benchmarks.ngrams [--repeat N] [--corpus PATH] [--top N]
+
+The corpus is a JSON list of objects with title and description keys,
+benchmarks/corpus.json by default.
+"""
+import argparse
+import json
+import os
+import time
+
+from collections import Counter
+
+from rest.extractors import SpacyExtractor, RegexExtractor
+
+
+BACKENDS = {
+    'spacy': lambda: SpacyExtractor(n_process=1, batch_size=64),
+    'regex': lambda: RegexExtractor(),
+}
+CORPUS = os.path.join(os.path.dirname(__file__), 'corpus.json')
+
+
+def load_texts(path):
+    with open(path) as f:
+        return [
+            text
+            for row in json.load(f)
+            for text in (row.get('title'), row.get('description'))
+            if text
+        ]
+
+
+def run(extractor, texts, repeat):
+    # NOTE: warm up, loads the spaCy model outside the timed runs.
+    terms = Counter(extractor.extract(texts))
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for _ in extractor.extract(texts):
+            pass
+    elapsed = time.perf_counter() - start
+
+    return terms, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--corpus', default=CORPUS)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    texts = load_texts(args.corpus)
+    n_chars = sum(len(text) for text in texts)
+    print(f'corpus: {len(texts)} texts, {n_chars} chars, x{args.repeat}')
+
+    results = {}
+    for name, factory in BACKENDS.items():
+        terms, elapsed = run(factory(), texts, args.repeat)
+        results[name] = terms
+        rate = len(texts) * args.repeat / elapsed
+        print(f'\n{name}: {elapsed:.3f}s, {rate:.0f} texts/s, '
+              f'{len(terms)} distinct terms, {sum(terms.values())} total')
+        print('  top: ' + ', '.join(
+            f'{ngram} ({freq})' for ngram, freq in terms.most_common(args.top)))
+
+    # NOTE: Term.ngram is case insensitive, compare the same way.
+    spacy_terms = {ngram.casefold() for ngram in results['spacy']}
+    regex_terms = {ngram.casefold() for ngram in results['regex']}
+    shared = spacy_terms & regex_terms
+    print(f'\nshared terms: {len(shared)}, '
+          f'{len(shared) / max(len(spacy_terms), 1):.0%} of spacy, '
+          f'{len(shared) / max(len(regex_terms), 1):.0%} of regex')
+
+
+if __name__ == '__main__':
+    main()
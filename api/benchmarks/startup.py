@@ -0,0 +1,57 @@
+"""
+Measure how long api.wsgi takes to import and how much memory the process
+holds afterwards. Each sample runs in a fresh interpreter.
+
+Usage (from the api directory):
+
+    python3 -m benchmarks.startup [--runs N] [--extract]
+
+--extract also loads the spaCy model afterwards, to show what a process
+that extracts search terms pays on top.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+
+PROBE = '''
+import json, resource, time
+start = time.perf_counter()
+import api.wsgi
+elapsed = time.perf_counter() - start
+if %(extract)r:
+    from rest.extractors import get_nlp
+    get_nlp()
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({'elapsed': elapsed, 'rss': rss}))
+'''
+
+
+def sample(extract):
+    output = subprocess.check_output(
+        [sys.executable, '-c', PROBE % {'extract': extract}])
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--extract', action='store_true')
+    args = parser.parse_args()
+
+    samples = [sample(args.extract) for _ in range(args.runs)]
+    elapsed = [s['elapsed'] for s in samples]
+    # NOTE: ru_maxrss is in KiB on Linux.
+    rss = [s['rss'] / 1024 for s in samples]
+
+    print(f'runs:        {args.runs}')
+    print(f'import time: median {statistics.median(elapsed):.3f}s, '
+          f'min {min(elapsed):.3f}s')
+    print(f'max rss:     median {statistics.median(rss):.1f}MiB, '
+          f'min {min(rss):.1f}MiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,4 @@
-import ast
+import json
 
 from django.db.models import Count
 from django.contrib import admin
@@ -9,18 +9,18 @@ from django.contrib.auth.forms import (
 from django.contrib.sites.models import Site
 from django.contrib.sites.admin import SiteAdmin as BaseSiteAdmin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from django.contrib.admin import widgets
 from django.utils.translation import gettext_lazy as _
 from django.utils.safestring import mark_safe
+from django.utils.html import format_html
 from django.urls import reverse
 
 from bitfield import BitField
 from bitfield.forms import BitFieldCheckboxSelectMultiple
-from picklefield.fields import PickledObjectField, dbsafe_encode
 
 from rest.models import (
     User, Channel, Video, VideoSource, Subscription, SiteOption,
-    MenuItem, Brand, OAuth2Client, StripeAccount, Package,
+    MenuItem, Brand, OAuth2Client, StripeAccount, Package, ChannelMeta,
+    VideoMeta, VideoSourceMeta, Crawl,
 )
 
 
@@ -61,13 +61,6 @@ class EditLinkToInlineObject(object):
             return ''
 
 
-class PickledObjectFieldTextAreaWidget(widgets.AdminTextareaWidget):
-    def value_from_datadict(self, data, files, name):
-        value = data.get(name)
-        # we gotta have a PickledObject here otherwise CharField cleaning kicks in
-        return dbsafe_encode(ast.literal_eval(value), False, 2, True)
-
-
 class UserCreationForm(BaseUserCreationForm):
     class Meta:
         model = User
@@ -158,6 +151,32 @@ class MenuItemAdmin(admin.ModelAdmin):
     pass
 
 
+class MetadataInline(admin.StackedInline):
+    # NOTE: the archived JSON is only decompressed when a change page is
+    # rendered.
+    fields = ('created', 'updated', 'original')
+    readonly_fields = fields
+    can_delete = False
+    extra = 0
+    max_num = 0
+
+    def original(self, obj):
+        return format_html(
+            '<pre>{}</pre>', json.dumps(obj.metadata, indent=2))
+
+
+class ChannelMetaInline(MetadataInline):
+    model = ChannelMeta
+
+
+class VideoMetaInline(MetadataInline):
+    model = VideoMeta
+
+
+class VideoSourceMetaInline(MetadataInline):
+    model = VideoSourceMeta
+
+
 class ChannelInline(admin.TabularInline):
     model = Channel
 
@@ -169,11 +188,9 @@ class ChannelAdmin(admin.ModelAdmin):
     )
     formfield_overrides = {
             BitField: {'widget': BitFieldCheckboxSelectMultiple},
-            PickledObjectField: {
-                'widget': PickledObjectFieldTextAreaWidget,
-            },
     }
     exclude = ('search',)
+    inlines = (ChannelMetaInline, )
 
     def video_count(self, obj):
         return obj.video_count
@@ -194,7 +211,7 @@ class VideoSourceInline(admin.TabularInline):
 class VideoAdmin(admin.ModelAdmin):
     list_display = ("title", "source_count", "poster", "published")
     list_filter = ("channel", )
-    inlines = (VideoSourceInline, )
+    inlines = (VideoSourceInline, VideoMetaInline, )
     ordering = ('-published',)
     readonly_fields = ('uid', )
 
@@ -210,6 +227,26 @@ class VideoAdmin(admin.ModelAdmin):
 @admin.register(VideoSource)
 class VideoSourceAdmin(admin.ModelAdmin):
     list_display = ("dimension", "video", "url", 'created', 'updated')
+    inlines = (VideoSourceMetaInline, )
+
+
+@admin.register(Crawl)
+class CrawlAdmin(admin.ModelAdmin):
+    list_display = (
+        'channel', 'started', 'status', 'wall_time', 'fetch_time', 'db_time',
+        'videos_created', 'videos_updated', 'videos_unchanged', 'queries',
+        'retries',
+    )
+    list_filter = ('status', 'backfill', 'channel')
+    list_select_related = ('channel', )
+    ordering = ('-started', )
+    date_hierarchy = 'started'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(Brand)
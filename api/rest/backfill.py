@@ -0,0 +1,410 @@
+import io
+import json
+import logging
+import uuid
+
+from dataclasses import asdict
+from datetime import date, datetime
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from rest.models import (
+    Video, VideoSource, VideoMeta, VideoSourceMeta, Tag, post_bulk_upsert,
+    fingerprint, video_fingerprint, compress_metadata, maybe_make_aware,
+)
+
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.addHandler(logging.NullHandler())
+
+# NOTE: text COPY format, these must be escaped inside values.
+COPY_ESCAPES = str.maketrans({
+    '\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r',
+})
+
+
+def copy_value(value):
+    if value is None:
+        return '\\N'
+
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+
+    if isinstance(value, (bytes, memoryview)):
+        # NOTE: bytea hex format, the backslash itself is escaped for COPY.
+        return '\\\\x' + bytes(value).hex()
+
+    if isinstance(value, (list, dict)):
+        value = json.dumps(value, separators=(',', ':'))
+
+    return str(value).translate(COPY_ESCAPES)
+
+
+def copy_rows(cursor, table, columns, rows):
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(copy_value(value) for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+
+    names = ', '.join(f'"{column}"' for column in columns)
+    cursor.copy_expert(f'COPY "{table}" ({names}) FROM STDIN', buffer)
+
+
+def column_type(model, name):
+    return model._meta.get_field(name).db_type(connection)
+
+
+class Backfill:
+    """
+    Loads a channel's videos through temporary staging tables. Rows are
+    streamed in with COPY, outside of any transaction, then merged into the
+    video, source, tag and metadata tables by a handful of set-based
+    statements in a single transaction. Meant for a channel's first crawl,
+    where the row-at-a-time path spends most of its time in round trips.
+
+    Use as a context manager, the staging tables are dropped on exit.
+
+    NOTE: the staging tables are TEMP rather than UNLOGGED. Neither is
+    written to the WAL, but temporary tables are private to the session
+    and dropped with the connection, so a worker that dies mid backfill
+    leaves nothing behind. They are not ON COMMIT DROP, the COPYs run in
+    several transactions while the crawl is still fetching.
+    """
+    def __init__(self, channel, copy_size=None):
+        self.channel = channel
+        self.copy_size = copy_size or settings.CRAWL_BACKFILL_COPY_SIZE
+        suffix = f'{channel.id}_{uuid.uuid4().hex[:8]}'
+        self.video_table = f'backfill_video_{suffix}'
+        self.source_table = f'backfill_source_{suffix}'
+        self.video_columns = None
+        self.source_columns = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        with connection.cursor() as c:
+            c.execute(f'''
+            DROP TABLE IF EXISTS "{self.video_table}", "{self.source_table}"
+            ''')
+
+    def create_tables(self, video_columns, source_columns):
+        self.video_columns = video_columns
+        self.source_columns = source_columns
+        videos = ', '.join(
+            f'"{name}" {column_type(Video, name)}' for name in video_columns)
+        sources = ', '.join(
+            f'"{name}" {column_type(VideoSource, name)}'
+            for name in source_columns)
+
+        with connection.cursor() as c:
+            c.execute(f'''
+            CREATE TEMP TABLE "{self.video_table}" (
+                "seq" bigint GENERATED ALWAYS AS IDENTITY,
+                "extern_id" varchar(128) NOT NULL,
+                {videos},
+                "tags" jsonb,
+                "blob_digest" varchar(64),
+                "blob_data" bytea,
+                "video_id" bigint,
+                "inserted" boolean
+            )''')
+            c.execute(f'''
+            CREATE TEMP TABLE "{self.source_table}" (
+                "seq" bigint GENERATED ALWAYS AS IDENTITY,
+                "video_extern_id" varchar(128) NOT NULL,
+                "extern_id" varchar(128) NOT NULL,
+                {sources},
+                "blob_digest" varchar(64),
+                "blob_data" bytea,
+                "video_source_id" bigint
+            )''')
+
+    def rows(self, datas):
+        """
+        Converts crawler dataclasses into staging rows the same way
+        VideoManager.bulk_from_dataclass() does.
+        """
+        videos, sources = [], []
+        for data in datas:
+            defaults = asdict(data)
+            extern_id = defaults.pop('extern_id')
+            defaults['fingerprint'] = video_fingerprint(data)
+            tags = defaults.pop('tags')
+            original = defaults.pop('original')
+            del defaults['sources']
+            defaults['published'] = maybe_make_aware(defaults['published'])
+
+            for source in data.sources or ():
+                source_defaults = asdict(source)
+                source_original = source_defaults.pop('original')
+                source_extern_id = source_defaults.pop('extern_id')
+                source_defaults['fingerprint'] = fingerprint(source)
+                sources.append((
+                    extern_id, source_extern_id, source_defaults,
+                    source_original))
+
+            videos.append((extern_id, defaults, tags, original))
+
+        if self.video_columns is None and videos:
+            source_columns = [*sources[0][2]] if sources else None
+            if source_columns is None:
+                source_columns = [
+                    field.attname
+                    for field in VideoSource._meta.concrete_fields
+                    if field.attname not in (
+                        'id', 'created', 'updated', 'video_id', 'extern_id')
+                ]
+            self.create_tables([*videos[0][1]], source_columns)
+
+        return (
+            [
+                (extern_id, *defaults.values(), tags, *self.blob(original))
+                for extern_id, defaults, tags, original in videos
+            ],
+            [
+                (video_extern_id, extern_id,
+                 *(defaults.get(name) for name in self.source_columns),
+                 *self.blob(original))
+                for video_extern_id, extern_id, defaults, original in sources
+            ],
+        )
+
+    def blob(self, data):
+        if data is None:
+            return None, None
+        return fingerprint(data), compress_metadata(data)
+
+    def stage(self, datas, progress=None):
+        """
+        COPY crawler output into the staging tables in chunks of copy_size,
+        calling progress() after each chunk. Returns the number of videos
+        staged.
+        """
+        datas, staged = iter(datas), 0
+        while True:
+            batch = list(islice(datas, self.copy_size))
+            if not batch:
+                break
+
+            videos, sources = self.rows(batch)
+            with connection.cursor() as c:
+                copy_rows(c, self.video_table, [
+                    'extern_id', *self.video_columns, 'tags', 'blob_digest',
+                    'blob_data',
+                ], videos)
+                copy_rows(c, self.source_table, [
+                    'video_extern_id', 'extern_id', *self.source_columns,
+                    'blob_digest', 'blob_data',
+                ], sources)
+
+            staged += len(videos)
+            LOGGER.debug('Staged %i videos for channel %s', staged,
+                         self.channel.name)
+            if progress:
+                progress()
+
+        return staged
+
+    @transaction.atomic
+    def merge(self, progress=None):
+        """
+        Merge the staging tables into the live tables, calling progress()
+        after each statement. Returns the ids of created and updated videos
+        and the number of unchanged ones.
+        """
+        if self.video_columns is None:
+            return [], [], 0
+
+        vt, st = self.video_table, self.source_table
+        now = timezone.now()
+        tags_table = Video.tags.through._meta.db_table
+        tag_table = Tag._meta.db_table
+        count_tagged = f'''
+            UPDATE "{tag_table}" SET "n_tagged" =
+                GREATEST("{tag_table}"."n_tagged" {{sign}} "d"."n", 0)
+            FROM (
+                SELECT "tag_id", COUNT(*) AS "n" FROM "{{rows}}"
+                GROUP BY "tag_id"
+            ) "d"
+            WHERE "{tag_table}"."id" = "d"."tag_id"'''
+        blob_table = VideoMeta._meta.get_field('blob').related_model \
+            ._meta.db_table
+
+        video_columns = ', '.join(f'"{name}"' for name in self.video_columns)
+        video_updates = ', '.join(
+            f'"{name}" = EXCLUDED."{name}"'
+            for name in ('updated', 'channel_id', *self.video_columns))
+        source_columns = ', '.join(
+            f'"{name}"' for name in self.source_columns)
+        staged_source_columns = ', '.join(
+            f'"{st}"."{name}"' for name in self.source_columns)
+        source_updates = ', '.join(
+            f'"{name}" = EXCLUDED."{name}"'
+            for name in ('updated', *self.source_columns))
+
+        with connection.cursor() as c:
+            def execute(sql, params=None):
+                c.execute(sql, params)
+                if progress:
+                    progress()
+
+            # NOTE: a crawler can yield the same video twice, the last wins.
+            execute(f'''
+            DELETE FROM "{vt}" "a" USING "{vt}" "b"
+            WHERE "a"."extern_id" = "b"."extern_id" AND "a"."seq" < "b"."seq"
+            ''')
+            execute(f'''
+            DELETE FROM "{st}" "a" USING "{st}" "b"
+            WHERE "a"."video_extern_id" = "b"."video_extern_id"
+            AND "a"."extern_id" = "b"."extern_id" AND "a"."seq" < "b"."seq"
+            ''')
+            execute(f'ANALYZE "{vt}", "{st}"')
+
+            # Videos, unchanged ones keep a NULL video_id.
+            execute(f'''
+            WITH "upserted" AS (
+                INSERT INTO "{Video._meta.db_table}" (
+                    "created", "updated", "channel_id", "extern_id",
+                    {video_columns})
+                SELECT %s, %s, %s, "extern_id", {video_columns} FROM "{vt}"
+                ON CONFLICT ("extern_id") DO UPDATE SET {video_updates}
+                WHERE "{Video._meta.db_table}"."fingerprint"
+                    IS DISTINCT FROM EXCLUDED."fingerprint"
+                RETURNING "id", "extern_id", (xmax = 0) AS "inserted"
+            )
+            UPDATE "{vt}" SET
+                "video_id" = "upserted"."id",
+                "inserted" = "upserted"."inserted"
+            FROM "upserted"
+            WHERE "{vt}"."extern_id" = "upserted"."extern_id"
+            ''', [now, now, self.channel.id])
+
+            # Tags, replaced outright for written videos.
+            execute(f'''
+            INSERT INTO "{tag_table}" ("name")
+            SELECT DISTINCT jsonb_array_elements_text("tags") FROM "{vt}"
+            WHERE "video_id" IS NOT NULL
+            ON CONFLICT DO NOTHING
+            ''')
+            # NOTE: n_tagged follows the rows actually deleted and inserted.
+            execute(f'''
+            WITH "deleted" AS (
+                DELETE FROM "{tags_table}" USING "{vt}"
+                WHERE "{tags_table}"."video_id" = "{vt}"."video_id"
+                AND NOT "{vt}"."inserted"
+                RETURNING "{tags_table}"."tag_id"
+            )
+            {count_tagged.format(rows='deleted', sign='-')}
+            ''')
+            execute(f'''
+            WITH "inserted" AS (
+                INSERT INTO "{tags_table}" ("video_id", "tag_id")
+                SELECT DISTINCT "{vt}"."video_id", "t"."id"
+                FROM "{vt}"
+                CROSS JOIN LATERAL jsonb_array_elements_text("{vt}"."tags")
+                    AS "n" ("name")
+                JOIN "{tag_table}" "t" ON "t"."name" = "n"."name"
+                WHERE "{vt}"."video_id" IS NOT NULL
+                ON CONFLICT DO NOTHING
+                RETURNING "tag_id"
+            )
+            {count_tagged.format(rows='inserted', sign='+')}
+            ''')
+
+            # Sources of written videos.
+            execute(f'''
+            WITH "upserted" AS (
+                INSERT INTO "{VideoSource._meta.db_table}" (
+                    "created", "updated", "video_id", "extern_id",
+                    {source_columns})
+                SELECT %s, %s, "{vt}"."video_id", "{st}"."extern_id",
+                    {staged_source_columns}
+                FROM "{st}"
+                JOIN "{vt}" ON "{vt}"."extern_id" = "{st}"."video_extern_id"
+                WHERE "{vt}"."video_id" IS NOT NULL
+                ON CONFLICT ("video_id", "extern_id") DO UPDATE
+                SET {source_updates}
+                WHERE "{VideoSource._meta.db_table}"."fingerprint"
+                    IS DISTINCT FROM EXCLUDED."fingerprint"
+                RETURNING "id", "video_id", "extern_id"
+            )
+            UPDATE "{st}" SET "video_source_id" = "upserted"."id"
+            FROM "upserted", "{vt}"
+            WHERE "{vt}"."video_id" = "upserted"."video_id"
+            AND "{st}"."video_extern_id" = "{vt}"."extern_id"
+            AND "{st}"."extern_id" = "upserted"."extern_id"
+            ''', [now, now])
+
+            # NOTE: DO UPDATE rather than DO NOTHING locks existing blobs so
+            # prune_metadata cannot remove them before they are referenced.
+            execute(f'''
+            INSERT INTO "{blob_table}" ("created", "digest", "data")
+            SELECT DISTINCT ON ("blob_digest") %s, "blob_digest", "blob_data"
+            FROM (
+                SELECT "blob_digest", "blob_data" FROM "{vt}"
+                WHERE "video_id" IS NOT NULL AND "blob_digest" IS NOT NULL
+                UNION ALL
+                SELECT "blob_digest", "blob_data" FROM "{st}"
+                WHERE "video_source_id" IS NOT NULL
+                AND "blob_digest" IS NOT NULL
+            ) "b"
+            ON CONFLICT ("digest") DO UPDATE SET "digest" = EXCLUDED."digest"
+            ''', [now])
+
+            for table, owner, model in (
+                (vt, 'video_id', VideoMeta),
+                (st, 'video_source_id', VideoSourceMeta),
+            ):
+                meta = model._meta.db_table
+                owner_column = model._meta.get_field(model.owner_field).column
+                execute(f'''
+                INSERT INTO "{meta}" (
+                    "created", "updated", "{owner_column}", "blob_id")
+                SELECT %s, %s, "{table}"."{owner}", "b"."id"
+                FROM "{table}"
+                JOIN "{blob_table}" "b"
+                    ON "b"."digest" = "{table}"."blob_digest"
+                WHERE "{table}"."{owner}" IS NOT NULL
+                ON CONFLICT ("{owner_column}") DO UPDATE SET
+                    "updated" = EXCLUDED."updated",
+                    "blob_id" = EXCLUDED."blob_id"
+                WHERE "{meta}"."blob_id" IS DISTINCT FROM EXCLUDED."blob_id"
+                ''', [now, now])
+
+            execute(f'''
+            SELECT "video_id", "inserted" FROM "{vt}"
+            WHERE "video_id" IS NOT NULL
+            ''')
+            created, updated = [], []
+            for video_id, inserted in c.fetchall():
+                (created if inserted else updated).append(video_id)
+
+            execute(f'SELECT COUNT(*) FROM "{vt}" WHERE "video_id" IS NULL')
+            unchanged = c.fetchone()[0]
+
+        post_bulk_upsert.send(sender=Video, created=created, instances=[
+            Video(id=video_id, channel=self.channel)
+            for video_id in created + updated
+        ])
+
+        return created, updated, unchanged
+
+
+def backfill_channel(channel, datas, progress=None):
+    """
+    Stage and merge all of a channel's videos, see Backfill. Returns the ids
+    of created and updated videos and the number of unchanged ones.
+    """
+    with Backfill(channel) as backfill:
+        staged = backfill.stage(datas, progress=progress)
+        LOGGER.info('Staged %i videos for channel %s, merging', staged,
+                    channel.name)
+        return backfill.merge(progress=progress)
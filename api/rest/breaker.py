@@ -0,0 +1,141 @@
+import logging
+import random
+
+from django.conf import settings
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.addHandler(logging.NullHandler())
+
+
+def backoff(retries, base=None, cap=None):
+    """
+    Seconds to wait before retry number retries + 1. Exponential with full
+    jitter, so retries of crawls that failed together spread out rather
+    than hitting the host again at the same moment.
+    """
+    base = (base or settings.CRAWL_RETRY_BACKOFF).total_seconds()
+    cap = (cap or settings.CRAWL_RETRY_BACKOFF_MAX).total_seconds()
+    return random.uniform(0, min(cap, base * 2 ** retries))
+
+
+def http_status(e):
+    """
+    HTTP status of a failed request, for the exceptions raised by aiohttp
+    and requests, or None.
+    """
+    status = getattr(e, 'status', None)
+    if status is None:
+        status = getattr(getattr(e, 'response', None), 'status_code', None)
+    return status if isinstance(status, int) else None
+
+
+def is_channel_error(e):
+    """
+    Whether e concerns a single channel rather than its host, such as a 404
+    for a deleted playlist. These say nothing about the host's health.
+    """
+    status = http_status(e)
+    return status is not None and 400 <= status < 500 \
+        and status not in (408, 429)
+
+
+class CircuitBreaker:
+    """
+    Per video host circuit breaker shared by all workers through Redis.
+
+    Failures of threshold distinct channels within window open the
+    circuit, crawls of the host are then short-circuited for cooldown.
+    After that the circuit is half open, a single crawl is let through as
+    a probe. It closes the circuit if it succeeds and reopens it if it
+    fails.
+
+    When Redis is unreachable the circuit is treated as closed, crawling
+    without a breaker beats not crawling at all.
+    """
+    def __init__(self, host, threshold=None, window=None, cooldown=None):
+        self.host = host
+        self.threshold = threshold or settings.CRAWL_BREAKER_THRESHOLD
+        self.window = window or settings.CRAWL_BREAKER_WINDOW
+        self.cooldown = cooldown or settings.CRAWL_BREAKER_COOLDOWN
+        self.failures_key = f'breaker:{host}:failures'
+        self.open_key = f'breaker:{host}:open'
+        self.tripped_key = f'breaker:{host}:tripped'
+        self.probe_key = f'breaker:{host}:probe'
+
+    def _seconds(self, value):
+        return int(value.total_seconds())
+
+    def allow(self):
+        """
+        Whether a crawl of the host may proceed.
+        """
+        try:
+            redis = get_redis_connection('default')
+            if redis.exists(self.open_key):
+                return False
+
+            if not redis.exists(self.tripped_key):
+                return True
+
+            # NOTE: half open, the first caller gets to probe the host.
+            return bool(redis.set(
+                self.probe_key, 1, nx=True, ex=self._seconds(self.cooldown)))
+
+        except RedisError:
+            LOGGER.warning('Redis unavailable, circuit for %s assumed closed',
+                           self.host)
+            return True
+
+    def success(self):
+        try:
+            redis = get_redis_connection('default')
+            if redis.delete(self.tripped_key):
+                LOGGER.info('Closing circuit for host %s', self.host)
+            redis.delete(self.failures_key, self.probe_key)
+
+        except RedisError:
+            LOGGER.warning('Redis unavailable, not recording success for %s',
+                           self.host)
+
+    def failure(self, channel_id):
+        """
+        Record a failed crawl of a channel. Returns True if the circuit is
+        now open.
+        """
+        try:
+            redis = get_redis_connection('default')
+            pipe = redis.pipeline()
+            # NOTE: a set of channel ids, so the retries of one crawl count
+            # once within the window.
+            pipe.sadd(self.failures_key, channel_id)
+            pipe.scard(self.failures_key)
+            pipe.exists(self.tripped_key)
+            added, failures, tripped = pipe.execute()
+            if added and failures == 1:
+                # NOTE: the window starts at the first failure.
+                redis.expire(self.failures_key, self._seconds(self.window))
+
+            if tripped or failures >= self.threshold:
+                self.trip()
+                return True
+
+        except RedisError:
+            LOGGER.warning('Redis unavailable, not recording failure for %s',
+                           self.host)
+
+        return False
+
+    def trip(self):
+        LOGGER.warning('Opening circuit for host %s for %s', self.host,
+                       self.cooldown)
+        redis = get_redis_connection('default')
+        pipe = redis.pipeline()
+        pipe.set(self.open_key, 1, ex=self._seconds(self.cooldown))
+        # NOTE: outlives the open key, marking the circuit half open.
+        pipe.set(self.tripped_key, 1, ex=self._seconds(
+            self.cooldown + self.window))
+        pipe.delete(self.failures_key, self.probe_key)
+        pipe.execute()
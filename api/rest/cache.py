@@ -0,0 +1,202 @@
+"""
+Shared response cache for anonymous catalog listings.
+
+Anonymous listings only depend on the site, the query string, the
+negotiated format and which channels are public, so one cached response
+serves every anonymous visitor. The response data and the headers the
+view set are stored, the response is rendered again on each hit.
+
+Entries are stored in the default cache (Redis) and are tied to tags,
+each holding a version token. rest.signals replaces the tokens of the
+tags a change touches, which retires every entry built under the old
+tokens.
+
+Entries are recomputed a little before they expire, with a probability
+that grows as expiry nears and with the time the listing took to build
+(XFetch). A lock lets a single request rebuild an entry while the others
+keep serving the current copy, or wait briefly for the new one if there
+is none.
+"""
+import hashlib
+import logging
+import math
+import random
+import time
+import uuid
+
+from functools import partial, wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from redis.exceptions import RedisError
+from rest_framework.response import Response
+
+from rest.models import Channel
+
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.addHandler(logging.NullHandler())
+
+# NOTE: above 1 favours earlier refreshes, below 1 later ones.
+EARLY_REFRESH_BETA = 1.0
+LOCK_POLL_INTERVAL = 0.05
+
+
+def tag_key(tag):
+    return f'listing:tag:{tag}'
+
+
+def listing_key(request):
+    params = sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in values
+    )
+    # NOTE: the format keeps the browsable API and JSON apart.
+    digest = hashlib.sha1(repr((
+        request.get_host(), request.path, params,
+        request.accepted_renderer.format,
+    )).encode()).hexdigest()
+    return f'listing:{request.site.id}:{digest}'
+
+
+def get_versions(tags, values):
+    """
+    Version tokens of tags, creating any that are missing.
+    """
+    versions = {tag: values.get(tag_key(tag)) for tag in tags}
+    for tag, version in versions.items():
+        if version is None:
+            cache.add(tag_key(tag), uuid.uuid4().hex, timeout=None)
+            versions[tag] = cache.get(tag_key(tag))
+    return versions
+
+
+def should_refresh(entry, now):
+    delta = entry['delta'] * EARLY_REFRESH_BETA * -math.log(
+        random.random() or 1e-12)
+    return now + delta >= entry['expires']
+
+
+def store(key, versions, response, delta):
+    ttl = settings.LISTING_CACHE_TTL.total_seconds()
+    grace = settings.LISTING_CACHE_GRACE.total_seconds()
+    cache.set(key, {
+        'versions': versions,
+        'data': response.data,
+        'headers': dict(response.items()),
+        'expires': time.time() + ttl,
+        'delta': delta,
+    }, timeout=ttl + grace)
+
+
+def compute(key, versions, view):
+    start = time.monotonic()
+    response = view()
+    if response.status_code == 200:
+        store(key, versions, response, time.monotonic() - start)
+    return response
+
+
+def wait_for(key, versions):
+    deadline = time.monotonic() + \
+        settings.LISTING_CACHE_LOCK_TIMEOUT.total_seconds()
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry and entry['versions'] == versions:
+            return entry
+    return None
+
+
+def respond(entry):
+    return Response(entry['data'], headers=entry.get('headers'))
+
+
+def cached_response(request, tags, view):
+    """
+    The response of view, a callable, served from the cache when a current
+    entry exists.
+    """
+    key = listing_key(request)
+    lock = f'{key}:lock'
+    values = cache.get_many([key, *map(tag_key, tags)])
+    versions = get_versions(tags, values)
+    entry = values.get(key)
+    if entry and entry['versions'] != versions:
+        # NOTE: invalidated, never served.
+        entry = None
+
+    now = time.time()
+    if entry and not should_refresh(entry, now):
+        return respond(entry)
+
+    lock_timeout = settings.LISTING_CACHE_LOCK_TIMEOUT.total_seconds()
+    if cache.add(lock, 1, timeout=lock_timeout):
+        try:
+            return compute(key, versions, view)
+
+        finally:
+            cache.delete(lock)
+
+    # NOTE: someone else is rebuilding the entry, serve the current copy
+    # meanwhile, past its expiry if need be, as it is still valid.
+    if entry:
+        return respond(entry)
+
+    entry = wait_for(key, versions)
+    if entry:
+        return respond(entry)
+
+    LOGGER.warning('Timed out waiting for listing %s', request.path)
+    return view()
+
+
+def cache_listing(*tags):
+    """
+    Cache a viewset method's anonymous GET responses, see cached_response().
+    Tags are formatted with the view's kwargs, for example 'channel:{uid}'.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            view = partial(method, self, request, *args, **kwargs)
+            if request.method != 'GET' or request.user.is_authenticated:
+                return view()
+
+            try:
+                return cached_response(
+                    request, [tag.format(**kwargs) for tag in tags], view)
+
+            except RedisError:
+                LOGGER.warning('Redis unavailable, not caching %s',
+                               request.path)
+                return view()
+        return wrapper
+    return decorator
+
+
+def channel_tag(channel_id):
+    return f'channel:{Channel.hashids().encode(channel_id)}'
+
+
+def _replace_versions(tags):
+    try:
+        cache.set_many(
+            {tag_key(tag): uuid.uuid4().hex for tag in tags}, timeout=None)
+
+    except RedisError:
+        # NOTE: entries expire after LISTING_CACHE_TTL plus the grace
+        # period, bounding how long a missed invalidation lasts.
+        LOGGER.warning('Redis unavailable, listings not invalidated')
+
+
+def invalidate(tags):
+    """
+    Retire the entries of tags once the current transaction commits, so
+    they are never rebuilt from data about to change.
+    """
+    tags = set(tags)
+    if tags:
+        transaction.on_commit(lambda: _replace_versions(tags))
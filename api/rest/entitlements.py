@@ -0,0 +1,151 @@
+"""
+Cached sets of the channels in packages each user subscribes to. Together
+with the public channels, which are filtered on directly, these are the
+channels the user may see.
+
+Sets are stored in Redis with a small per process LRU in front. Both are
+keyed by a per user version token, which rest.signals replaces when the
+user's subscriptions or their packages' channels change, so a replaced
+token retires every copy of the stale set at once.
+"""
+import json
+import logging
+import threading
+import time
+import uuid
+
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.addHandler(logging.NullHandler())
+
+SUBSCRIBED_CHANNELS_SQL = '''
+SELECT DISTINCT "p"."channel_id"
+FROM "rest_subscription" "s"
+JOIN "rest_channel_packages" "p" ON "p"."package_id" = "s"."package_id"
+WHERE "s"."user_id" = %s
+'''
+
+
+def user_version_key(user_id):
+    return f'entitlements:{user_id}:version'
+
+
+class LocalCache:
+    """
+    Thread safe LRU mapping of limited size whose items expire after ttl.
+    """
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl.total_seconds()
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            try:
+                expires, value = self.items[key]
+
+            except KeyError:
+                return None
+
+            if expires < time.monotonic():
+                del self.items[key]
+                return None
+
+            self.items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.items[key] = (time.monotonic() + self.ttl, value)
+            self.items.move_to_end(key)
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+LOCAL = LocalCache(
+    settings.ENTITLEMENTS_LOCAL_SIZE, settings.ENTITLEMENTS_CACHE_TTL)
+
+
+def load_channel_ids(user_id):
+    with connection.cursor() as c:
+        c.execute(SUBSCRIBED_CHANNELS_SQL, [user_id])
+        return sorted(row[0] for row in c.fetchall())
+
+
+def get_version(redis, user_id):
+    key = user_version_key(user_id)
+    version = redis.get(key)
+    if version is None:
+        # NOTE: a fresh token rather than a default, so a flushed Redis can
+        # never bring back a version a local cache still holds.
+        pipe = redis.pipeline()
+        pipe.set(key, uuid.uuid4().hex, nx=True)
+        pipe.get(key)
+        version = pipe.execute()[-1]
+    return version.decode()
+
+
+def subscribed_channel_ids(user):
+    """
+    Ids of the channels in packages user subscribes to, sorted.
+    """
+    try:
+        redis = get_redis_connection('default')
+        version = get_version(redis, user.id)
+        key = f'entitlements:{user.id}:{version}'
+        channel_ids = LOCAL.get(key)
+        if channel_ids is not None:
+            return channel_ids
+
+        cached = redis.get(key)
+        if cached is None:
+            channel_ids = load_channel_ids(user.id)
+            redis.set(key, json.dumps(channel_ids), ex=int(
+                settings.ENTITLEMENTS_CACHE_TTL.total_seconds()))
+
+        else:
+            channel_ids = json.loads(cached)
+
+        LOCAL.set(key, channel_ids)
+        return channel_ids
+
+    except RedisError:
+        LOGGER.warning('Redis unavailable, loading entitlements of user %i',
+                       user.id)
+        return load_channel_ids(user.id)
+
+
+def _replace_versions(keys):
+    try:
+        redis = get_redis_connection('default')
+        pipe = redis.pipeline()
+        for key in keys:
+            pipe.set(key, uuid.uuid4().hex)
+        pipe.execute()
+
+    except RedisError:
+        # NOTE: cached sets expire after ENTITLEMENTS_CACHE_TTL, bounding
+        # how long a missed invalidation lasts.
+        LOGGER.warning('Redis unavailable, entitlements not invalidated')
+
+
+def invalidate_users(user_ids):
+    """
+    Retire the cached sets of the given users once the current transaction
+    commits, so they are never rebuilt from data about to change.
+    """
+    keys = [user_version_key(user_id) for user_id in set(user_ids)]
+    if keys:
+        transaction.on_commit(lambda: _replace_versions(keys))
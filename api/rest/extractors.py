@@ -0,0 +1,117 @@
+import re
+import logging
+
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.addHandler(logging.NullHandler())
+
+# NOTE: Term.ngram is limited to 64 characters.
+MAX_NGRAM_LENGTH = 64
+
+# NOTE: noun_chunks only needs the parser and POS tags.
+NLP_MODEL = 'en_core_web_sm'
+NLP_EXCLUDE = ('ner', 'lemmatizer', 'senter')
+
+STOPWORDS = frozenset('''
+a about above after again against all am an and any are as at be because
+been before being below between both but by can could did do does doing
+down during each few for from further had has have having he her here hers
+herself him himself his how i if in into is it its itself just me more
+most my myself no nor not now of off on once only or other our ours
+ourselves out over own same she should so some such than that the their
+theirs them themselves then there these they this those through to too
+under until up very was we were what when where which while who whom why
+will with would you your yours yourself yourselves
+'''.split())
+
+
+@lru_cache(maxsize=None)
+def get_nlp():
+    """
+    Load the spaCy model on first use, so processes that never extract
+    terms (web workers, beat, migrations) never pay for it.
+    """
+    import spacy
+
+    LOGGER.info('Loading spaCy model %s', NLP_MODEL)
+    return spacy.load(NLP_MODEL, exclude=NLP_EXCLUDE)
+
+
+class Extractor:
+    """
+    Extracts search term ngrams from texts. Subclasses implement
+    extract_ngrams(), yielding the ngrams of each text in turn. Ngrams too
+    long to store are dropped.
+    """
+    def extract(self, texts):
+        for ngrams in self.extract_each(texts):
+            yield from ngrams
+
+    def extract_each(self, texts):
+        for ngrams in self.extract_ngrams(texts):
+            yield [
+                ngram for ngram in ngrams if len(ngram) <= MAX_NGRAM_LENGTH
+            ]
+
+    def extract_ngrams(self, texts):
+        raise NotImplementedError()
+
+
+class SpacyExtractor(Extractor):
+    """
+    Noun chunks from spaCy's dependency parse.
+    """
+    def __init__(self, n_process=None, batch_size=None):
+        self.n_process = n_process or settings.SEARCH_NLP_PROCESSES
+        self.batch_size = batch_size or settings.SEARCH_NLP_BATCH_SIZE
+
+    def extract_ngrams(self, texts):
+        nlp = get_nlp()
+        docs = nlp.pipe(
+            texts, n_process=self.n_process, batch_size=self.batch_size)
+        for doc in docs:
+            yield [ngram.text for ngram in doc.noun_chunks]
+
+
+class RegexExtractor(Extractor):
+    """
+    1 to max_n word ngrams that neither start nor end with a stopword. Runs
+    never cross punctuation, no model is loaded.
+    """
+    PHRASE = re.compile(r"[^.,;:!?()\[\]{}\"|/\n]+")
+    WORD = re.compile(r"\w+(?:['’]\w+)*")
+
+    def __init__(self, max_n=3, stopwords=STOPWORDS):
+        self.max_n = max_n
+        self.stopwords = stopwords
+
+    def is_term(self, word):
+        return word.lower() not in self.stopwords and not word.isdigit()
+
+    def extract_ngrams(self, texts):
+        for text in texts:
+            yield list(self.extract_text(text))
+
+    def extract_text(self, text):
+        for phrase in self.PHRASE.findall(text):
+            words = self.WORD.findall(phrase)
+            for i, word in enumerate(words):
+                if not self.is_term(word):
+                    continue
+                for n in range(1, self.max_n + 1):
+                    gram = words[i:i + n]
+                    if len(gram) < n:
+                        break
+                    if self.is_term(gram[-1]):
+                        yield ' '.join(gram)
+
+
+@lru_cache(maxsize=None)
+def get_extractor():
+    return import_string(settings.SEARCH_EXTRACTOR)(
+        **settings.SEARCH_EXTRACTOR_OPTIONS)
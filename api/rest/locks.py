@@ -0,0 +1,110 @@
+import logging
+import uuid
+
+from django.conf import settings
+from django.db import connection
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+
+LOGGER = logging.getLogger(__name__)
+
+# NOTE: first key of the two-int advisory lock form, keeps our locks apart
+# from any other advisory locks taken against the same database.
+ADVISORY_LOCK_NAMESPACE = 0x63727777
+
+# Delete / extend the key only if it still holds our token, so a lease that
+# expired and was taken by another worker is never released by us.
+RELEASE_SCRIPT = '''
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+'''
+RENEW_SCRIPT = '''
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
+'''
+
+
+class Lease:
+    """
+    Exclusive, expiring lease on a named resource.
+
+    Held as a Redis key with a TTL so it lapses if the worker dies. When
+    Redis is unreachable a session level Postgres advisory lock is used
+    instead, which is released when the holding connection closes.
+    """
+    def __init__(self, name, key, ttl=None):
+        self.name = f'lease:{name}:{key}'
+        self.key = key
+        self.ttl = ttl or settings.CRAWL_LEASE_TTL
+        self.token = uuid.uuid4().hex
+        self.backend = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+    def acquire(self):
+        try:
+            redis = get_redis_connection('default')
+            if redis.set(self.name, self.token, nx=True, px=self._ttl_ms()):
+                self.backend = 'redis'
+
+        except RedisError:
+            LOGGER.warning('Redis unavailable, using advisory lock for %s',
+                           self.name)
+            with connection.cursor() as c:
+                c.execute('SELECT pg_try_advisory_lock(%s, %s)',
+                          [ADVISORY_LOCK_NAMESPACE, self.key])
+                if c.fetchone()[0]:
+                    self.backend = 'postgres'
+
+        return self.acquired
+
+    @property
+    def acquired(self):
+        return self.backend is not None
+
+    def renew(self):
+        # NOTE: advisory locks live as long as the connection, nothing to do.
+        if self.backend != 'redis':
+            return self.acquired
+
+        try:
+            redis = get_redis_connection('default')
+            renewed = redis.eval(
+                RENEW_SCRIPT, 1, self.name, self.token, self._ttl_ms())
+
+        except RedisError:
+            LOGGER.warning('Could not renew lease %s', self.name)
+            return False
+
+        if not renewed:
+            LOGGER.warning('Lease %s was lost', self.name)
+        return bool(renewed)
+
+    def release(self):
+        backend, self.backend = self.backend, None
+        try:
+            if backend == 'redis':
+                redis = get_redis_connection('default')
+                redis.eval(RELEASE_SCRIPT, 1, self.name, self.token)
+
+            elif backend == 'postgres':
+                with connection.cursor() as c:
+                    c.execute('SELECT pg_advisory_unlock(%s, %s)',
+                              [ADVISORY_LOCK_NAMESPACE, self.key])
+
+        except RedisError:
+            # NOTE: the key expires on its own.
+            LOGGER.warning('Could not release lease %s', self.name)
+
+    def _ttl_ms(self):
+        return int(self.ttl.total_seconds() * 1000)
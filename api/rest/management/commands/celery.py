@@ -4,7 +4,7 @@ import logging
 
 from functools import partial
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.utils import autoreload
 from django.conf import settings
 
@@ -18,10 +18,34 @@ def restart_celery(celery_command, **kwargs):
     subprocess.call(celery_command)
 
 
+def queue_options(queues):
+    """
+    Concurrency and prefetch for a worker consuming queues, from
+    settings.CELERY_WORKER_QUEUES. A worker shared by several queues gets
+    the largest concurrency and the smallest prefetch among them.
+    """
+    try:
+        options = [settings.CELERY_WORKER_QUEUES[queue] for queue in queues]
+
+    except KeyError as e:
+        raise CommandError(f'Unknown queue {e.args[0]}')
+
+    return (
+        max(option['concurrency'] for option in options),
+        min(option['prefetch'] for option in options),
+    )
+
+
 class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument('--uid', type=int)
         parser.add_argument('--gid', type=int)
+        parser.add_argument('-l', '--loglevel')
+        parser.add_argument(
+            '-Q', '--queues',
+            help='Comma separated queues to consume, all queues by default.')
+        parser.add_argument('-c', '--concurrency', type=int)
+        parser.add_argument('--prefetch', type=int)
 
     def handle(self, *args, **options):
         LOGGER.debug('Celery args: %s', args)
@@ -33,7 +57,30 @@ class Command(BaseCommand):
             celery_command += ('--uid', str(options['uid']))
         if options['gid']:
             celery_command += ('--gid', str(options['gid']))
+        if options['loglevel']:
+            # NOTE: replaces the level in CELERY_COMMAND, if any.
+            if '-l' in celery_command:
+                i = celery_command.index('-l')
+                celery_command = celery_command[:i] + celery_command[i + 2:]
+            celery_command += ('-l', options['loglevel'])
+
+        if options['queues']:
+            queues = [
+                q.strip() for q in options['queues'].split(',') if q.strip()
+            ]
+        else:
+            queues = list(settings.CELERY_WORKER_QUEUES)
+        concurrency, prefetch = queue_options(queues)
+        # NOTE: a unique node name per queue set, so several workers can run
+        # on one host.
+        celery_command += (
+            '-Q', ','.join(queues),
+            '-n', f'{"-".join(queues)}@%h',
+            '-c', str(options['concurrency'] or concurrency),
+            '--prefetch-multiplier', str(options['prefetch'] or prefetch),
+        )
 
+        LOGGER.info('Celery command: %s', shlex.join(celery_command))
         if settings.CELERY_AUTORELOAD:
             LOGGER.info('Starting celery worker with autoreload...')
             autoreload.run_with_reloader(
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+
+from rest.tasks.counters import COUNTED_MODELS, reconcile_model
+
+
+class Command(BaseCommand):
+    help = 'Recount stored counters in batches and repair any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-m', '--model', action='append', dest='models',
+            choices=[model._meta.model_name for model in COUNTED_MODELS],
+            help='Model to reconcile, may be repeated. All by default.')
+        parser.add_argument('--batch-size', type=int)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size'] or \
+            settings.COUNTER_RECONCILE_BATCH_SIZE
+        if batch_size < 1:
+            raise CommandError('Batch size must be positive')
+
+        models = [
+            model for model in COUNTED_MODELS
+            if not options['models']
+            or model._meta.model_name in options['models']
+        ]
+        for model in models:
+            repaired = reconcile_model(model, batch_size)
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: {repaired} repaired')
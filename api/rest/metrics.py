@@ -0,0 +1,84 @@
+"""
+Crawl telemetry in the Prometheus text exposition format. Values are
+gauges computed from the Crawl table over settings.CRAWL_METRICS_WINDOW,
+so scrapes from several replicas agree.
+"""
+from django.conf import settings
+from django.utils import timezone
+
+from rest.models import Crawl
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+SUMMARY_METRICS = (
+    ('cesium_crawls', 'Crawls started in the window.', (
+        ({}, 'crawls'),
+    )),
+    ('cesium_crawl_seconds', 'Total crawl time in the window.', (
+        ({'phase': 'wall'}, 'wall_time'),
+        ({'phase': 'fetch'}, 'fetch_time'),
+        ({'phase': 'db'}, 'db_time'),
+    )),
+    ('cesium_crawl_videos', 'Videos seen by crawls in the window.', (
+        ({'result': 'created'}, 'videos_created'),
+        ({'result': 'updated'}, 'videos_updated'),
+        ({'result': 'unchanged'}, 'videos_unchanged'),
+    )),
+    ('cesium_crawl_queries', 'SQL queries run by crawls in the window.', (
+        ({}, 'queries'),
+    )),
+    ('cesium_crawl_retries', 'Retries of crawls in the window.', (
+        ({}, 'retries'),
+    )),
+)
+
+
+def escape(value):
+    return str(value) \
+        .replace('\\', '\\\\') \
+        .replace('"', '\\"') \
+        .replace('\n', '\\n')
+
+
+def sample(name, labels, value):
+    if labels:
+        pairs = ','.join(
+            f'{key}="{escape(label)}"' for key, label in labels.items())
+        name = f'{name}{{{pairs}}}'
+    return f'{name} {value or 0}'
+
+
+def header(name, help):
+    return [f'# HELP {name} {help}', f'# TYPE {name} gauge']
+
+
+def render_metrics(now=None):
+    since = (now or timezone.now()) - settings.CRAWL_METRICS_WINDOW
+    summary = list(Crawl.objects.summary(since))
+    lines = header(
+        'cesium_crawl_window_seconds', 'Length of the reporting window.')
+    lines.append(sample(
+        'cesium_crawl_window_seconds', {},
+        settings.CRAWL_METRICS_WINDOW.total_seconds()))
+
+    for name, help, series in SUMMARY_METRICS:
+        lines.extend(header(name, help))
+        for row in summary:
+            for labels, key in series:
+                lines.append(sample(
+                    name, {'status': row['status'], **labels}, row[key]))
+
+    # NOTE: only the slowest channels, labelling every channel would make
+    # the series count grow with the channel count.
+    name = 'cesium_crawl_channel_seconds'
+    lines.extend(header(
+        name, 'Average crawl wall time of the slowest channels.'))
+    slowest = Crawl.objects.slowest(since, settings.CRAWL_METRICS_SLOWEST)
+    for row in slowest:
+        lines.append(sample(name, {
+            'channel_id': row['channel_id'],
+            'channel': row['channel__name'],
+        }, row['wall_time']))
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.2 on 2026-10-18 02:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rest', '0002_brand_channel_oauth2client_package_tag_video_and_more'),
+    ]
+
+    operations = [
+        # NOTE: update_or_create() could race and leave more than one metadata
+        # row per object, keep the newest so the constraints can be created.
+        migrations.RunSQL("""
+        DELETE FROM "rest_channelmeta" a USING "rest_channelmeta" b
+        WHERE a."channel_id" = b."channel_id" AND a."id" < b."id";
+        DELETE FROM "rest_videometa" a USING "rest_videometa" b
+        WHERE a."video_id" = b."video_id" AND a."id" < b."id";
+        DELETE FROM "rest_videosourcemeta" a USING "rest_videosourcemeta" b
+        WHERE a."video_source_id" = b."video_source_id" AND a."id" < b."id";
+        """, migrations.RunSQL.noop),
+        migrations.AddConstraint(
+            model_name='channelmeta',
+            constraint=models.UniqueConstraint(fields=('channel',), name='rest_channelmeta_channel_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='videometa',
+            constraint=models.UniqueConstraint(fields=('video',), name='rest_videometa_video_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='videosourcemeta',
+            constraint=models.UniqueConstraint(fields=('video_source',), name='rest_videosourcemeta_video_source_uniq'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.2 on 2026-10-18 02:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rest', '0004_crawl_fingerprints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='channel',
+            name='crawled',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
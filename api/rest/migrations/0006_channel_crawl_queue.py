@@ -0,0 +1,52 @@
+# Generated by Django 4.2.2 on 2026-10-18 02:43
+
+import datetime
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def delete_channel_tasks(apps, schema_editor):
+    # NOTE: channels are crawled from the next_crawl_at queue now, drop their
+    # periodic tasks. The FK cascades, so detach before deleting.
+    Channel = apps.get_model('rest', 'Channel')
+    PeriodicTask = apps.get_model('django_celery_beat', 'PeriodicTask')
+    PeriodicTasks = apps.get_model('django_celery_beat', 'PeriodicTasks')
+
+    task_ids = list(
+        Channel.objects
+        .filter(task__isnull=False)
+        .values_list('task_id', flat=True))
+    if not task_ids:
+        return
+
+    Channel.objects.update(task=None)
+    PeriodicTask.objects.filter(id__in=task_ids).delete()
+    # Tell beat's DatabaseScheduler to reload it's schedule.
+    PeriodicTasks.objects.update_or_create(
+        ident=1, defaults={'last_update': timezone.now()})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rest', '0005_channel_crawled'),
+        ('django_celery_beat', '0018_improve_crontab_helptext'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_channel_tasks, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='channel',
+            name='task',
+        ),
+        migrations.AddField(
+            model_name='channel',
+            name='crawl_interval',
+            field=models.DurationField(default=datetime.timedelta(seconds=14400)),
+        ),
+        migrations.AddField(
+            model_name='channel',
+            name='next_crawl_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.2 on 2026-10-18 02:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rest', '0006_channel_crawl_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TermSource',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=32)),
+                ('object_id', models.BigIntegerField()),
+                ('ngrams', models.JSONField(default=dict)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='termsource',
+            constraint=models.UniqueConstraint(fields=('model', 'object_id'), name='rest_termsource_object_uniq'),
+        ),
+    ]
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import zlib
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+from psycopg2.extras import execute_values
+
+
+TABLES = ('rest_channelmeta', 'rest_videometa', 'rest_videosourcemeta')
+BATCH_SIZE = 1000
+
+
+# NOTE: frozen copies of rest.models.fingerprint() and compress_metadata()
+# as of this migration, for the plain JSON stored in the old columns.
+def fingerprint(data):
+    normalized = json.dumps(data, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(normalized.encode('utf8')).hexdigest()
+
+
+def compress_metadata(data):
+    return zlib.compress(
+        json.dumps(data, separators=(',', ':')).encode('utf8'))
+
+
+def load_json(value):
+    # NOTE: Django registers an identity loader for jsonb, raw cursors get
+    # the JSON text rather than the decoded value.
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def archive_metadata(apps, schema_editor):
+    # NOTE: moves the plain JSON into deduplicated, compressed blobs in
+    # batches, so large tables are never loaded at once.
+    with schema_editor.connection.cursor() as c:
+        for table in TABLES:
+            while True:
+                c.execute(f'''
+                SELECT "id", "metadata" FROM "{table}"
+                WHERE "blob_id" IS NULL
+                ORDER BY "id"
+                LIMIT %s''', [BATCH_SIZE])
+                rows = [(id, load_json(data)) for id, data in c.fetchall()]
+                if not rows:
+                    break
+
+                payloads = {fingerprint(data): data for _, data in rows}
+                blob_ids = dict(execute_values(c, '''
+                INSERT INTO "rest_metadatablob" ("created", "digest", "data")
+                VALUES %s
+                ON CONFLICT ("digest") DO
+                UPDATE SET "digest" = EXCLUDED."digest"
+                RETURNING "digest", "id"''', [
+                    (timezone.now(), digest, compress_metadata(data))
+                    for digest, data in payloads.items()
+                ], page_size=len(payloads), fetch=True))
+
+                execute_values(c, f'''
+                UPDATE "{table}" SET "blob_id" = "v"."blob_id"
+                FROM (VALUES %s) AS "v" ("id", "blob_id")
+                WHERE "{table}"."id" = "v"."id"''', [
+                    (id, blob_ids[fingerprint(data)]) for id, data in rows
+                ], page_size=len(rows))
+
+        # NOTE: deferred FK checks would block the ALTER TABLEs that follow.
+        c.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rest', '0007_term_source'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetadataBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('digest', models.CharField(max_length=64, unique=True)),
+                ('data', models.BinaryField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='channelmeta',
+            name='blob',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='rest.metadatablob'),
+        ),
+        migrations.AddField(
+            model_name='videometa',
+            name='blob',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='rest.metadatablob'),
+        ),
+        migrations.AddField(
+            model_name='videosourcemeta',
+            name='blob',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='rest.metadatablob'),
+        ),
+        migrations.RunPython(archive_metadata),
+        migrations.RemoveField(
+            model_name='channelmeta',
+            name='fingerprint',
+        ),
+        migrations.RemoveField(
+            model_name='channelmeta',
+            name='metadata',
+        ),
+        migrations.RemoveField(
+            model_name='videometa',
+            name='fingerprint',
+        ),
+        migrations.RemoveField(
+            model_name='videometa',
+            name='metadata',
+        ),
+        migrations.RemoveField(
+            model_name='videosourcemeta',
+            name='fingerprint',
+        ),
+        migrations.RemoveField(
+            model_name='videosourcemeta',
+            name='metadata',
+        ),
+        migrations.AlterField(
+            model_name='channelmeta',
+            name='blob',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='rest.metadatablob'),
+        ),
+        migrations.AlterField(
+            model_name='videometa',
+            name='blob',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='rest.metadatablob'),
+        ),
+        migrations.AlterField(
+            model_name='videosourcemeta',
+            name='blob',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='rest.metadatablob'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+from django.db import migrations
+import rest.models
+
+
+BATCH_SIZE = 500
+
+
+def copy_state(src, dst):
+    def copy(apps, schema_editor):
+        # NOTE: the field classes do the (un)pickling and (un)packing.
+        Channel = apps.get_model('rest', 'Channel')
+        channels = Channel.objects \
+            .exclude(**{f'{src}__isnull': True}) \
+            .only('id', src) \
+            .iterator(chunk_size=BATCH_SIZE)
+
+        batch = []
+        for channel in channels:
+            setattr(channel, dst, getattr(channel, src))
+            batch.append(channel)
+            if len(batch) == BATCH_SIZE:
+                Channel.objects.bulk_update(batch, [dst])
+                batch = []
+        Channel.objects.bulk_update(batch, [dst])
+    return copy
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rest', '0008_metadata_blob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='channel',
+            name='state_packed',
+            field=rest.models.StateField(blank=True, editable=True, null=True),
+        ),
+        migrations.RunPython(
+            copy_state('state', 'state_packed'),
+            copy_state('state_packed', 'state')),
+        migrations.RemoveField(
+            model_name='channel',
+            name='state',
+        ),
+        migrations.RenameField(
+            model_name='channel',
+            old_name='state_packed',
+            new_name='state',
+        ),
+    ]
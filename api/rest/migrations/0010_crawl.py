@@ -0,0 +1,36 @@
+# Generated by Django 4.2.2 on 2026-10-18 03:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rest', '0009_channel_state_msgpack'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Crawl',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started', models.DateTimeField(default=django.utils.timezone.now)),
+                ('status', models.CharField(choices=[('ok', 'ok'), ('failed', 'failed'), ('retry', 'retry')], max_length=8)),
+                ('backfill', models.BooleanField(default=False)),
+                ('wall_time', models.FloatField(default=0)),
+                ('fetch_time', models.FloatField(default=0)),
+                ('db_time', models.FloatField(default=0)),
+                ('videos_created', models.PositiveIntegerField(default=0)),
+                ('videos_updated', models.PositiveIntegerField(default=0)),
+                ('videos_unchanged', models.PositiveIntegerField(default=0)),
+                ('queries', models.PositiveIntegerField(default=0)),
+                ('retries', models.PositiveSmallIntegerField(default=0)),
+                ('channel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='crawls', to='rest.channel')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['channel', '-started'], name='rest_crawl_channel_faf915_idx'), models.Index(fields=['started'], name='rest_crawl_started_e05b8c_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 4.2.2 on 2026-10-18 03:07
+
+from django.db import migrations, models
+
+
+# NOTE: each table is aggregated on its own, joining them would multiply
+# rows.
+COUNT_SQL = '''
+UPDATE "rest_video" SET "{field}" = "c"."n"
+FROM (
+    SELECT "video_id", COUNT(*) AS "n" FROM "{table}" GROUP BY "video_id"
+) AS "c"
+WHERE "rest_video"."id" = "c"."video_id"
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rest', '0010_crawl'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='n_dislikes',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='n_likes',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='n_plays',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        # NOTE: Django drops column defaults after adding a field, keep them
+        # for the raw INSERTs of the crawler (upsert_rows, rest.backfill).
+        migrations.RunSQL(
+            '''
+            ALTER TABLE "rest_video"
+                ALTER COLUMN "n_plays" SET DEFAULT 0,
+                ALTER COLUMN "n_likes" SET DEFAULT 0,
+                ALTER COLUMN "n_dislikes" SET DEFAULT 0
+            ''',
+            '''
+            ALTER TABLE "rest_video"
+                ALTER COLUMN "n_plays" DROP DEFAULT,
+                ALTER COLUMN "n_likes" DROP DEFAULT,
+                ALTER COLUMN "n_dislikes" DROP DEFAULT
+            ''',
+        ),
+        migrations.RunSQL(
+            [
+                COUNT_SQL.format(field='n_plays', table='rest_play'),
+                COUNT_SQL.format(field='n_likes', table='rest_like'),
+                COUNT_SQL.format(field='n_dislikes', table='rest_dislike'),
+            ],
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['n_plays'], name='rest_video_n_plays_00d35a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['n_likes'], name='rest_video_n_likes_23dbec_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['n_dislikes'], name='rest_video_n_disli_174108_idx'),
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 4.2.2 on 2026-10-18 03:11
+
+from django.db import migrations, models
+
+
+COUNT_SQL = '''
+UPDATE "{table}" SET "{field}" = "c"."n"
+FROM ({counts}) AS "c"
+WHERE "{table}"."id" = "c"."id"
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rest', '0011_video_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='channel',
+            name='n_subscribers',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='channel',
+            name='n_videos',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='n_tagged',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        # NOTE: Django drops column defaults after adding a field, keep them
+        # for raw INSERTs (TagManager.upsert_names, rest.backfill).
+        migrations.RunSQL(
+            '''
+            ALTER TABLE "rest_channel"
+                ALTER COLUMN "n_videos" SET DEFAULT 0,
+                ALTER COLUMN "n_subscribers" SET DEFAULT 0;
+            ALTER TABLE "rest_tag"
+                ALTER COLUMN "n_tagged" SET DEFAULT 0
+            ''',
+            '''
+            ALTER TABLE "rest_channel"
+                ALTER COLUMN "n_videos" DROP DEFAULT,
+                ALTER COLUMN "n_subscribers" DROP DEFAULT;
+            ALTER TABLE "rest_tag"
+                ALTER COLUMN "n_tagged" DROP DEFAULT
+            ''',
+        ),
+        migrations.RunSQL(
+            [
+                COUNT_SQL.format(
+                    table='rest_channel', field='n_videos', counts='''
+                    SELECT "channel_id" AS "id", COUNT(*) AS "n"
+                    FROM "rest_video" GROUP BY "channel_id"
+                    '''),
+                COUNT_SQL.format(
+                    table='rest_channel', field='n_subscribers', counts='''
+                    SELECT "p"."channel_id" AS "id", COUNT(*) AS "n"
+                    FROM "rest_subscription" "s"
+                    JOIN "rest_channel_packages" "p"
+                        ON "p"."package_id" = "s"."package_id"
+                    GROUP BY "p"."channel_id"
+                    '''),
+                COUNT_SQL.format(
+                    table='rest_tag', field='n_tagged', counts='''
+                    SELECT "tag_id" AS "id", COUNT(*) AS "n"
+                    FROM "rest_video_tags" GROUP BY "tag_id"
+                    '''),
+            ],
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='channel',
+            index=models.Index(fields=['n_videos'], name='rest_channe_n_video_ed4ec6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['n_tagged'], name='rest_tag_n_tagge_74a7ee_idx'),
+        ),
+    ]
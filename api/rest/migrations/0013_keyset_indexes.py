@@ -0,0 +1,25 @@
+# Generated by Django 4.2.2 on 2026-10-18 03:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rest', '0012_channel_tag_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='channel',
+            index=models.Index(fields=['name', 'id'], name='rest_channe_name_a559d5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['published', 'id'], name='rest_video_publish_e7881d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['channel', 'published', 'id'], name='rest_video_channel_b84980_idx'),
+        ),
+    ]
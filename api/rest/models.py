@@ -4,23 +4,32 @@ import uuid
 import string
 import random
 import json
+import hashlib
 import time
 import shlex
+import zlib
+from base64 import b64encode
+from copy import deepcopy
 from os.path import splitext
-from datetime import timedelta
-from dataclasses import asdict
+from collections import Counter
+from urllib.parse import urlparse
+from datetime import date, datetime, timedelta
+from dataclasses import asdict, is_dataclass
 
 import sass
+import msgpack
 from csscompressor import compress
 
 from django import forms
 from django.db import models, connection
 from django.db.models import (
-    Exists, Count, OuterRef, Subquery, Func, F, Q, Max,
+    Count, Func, F, Q, Max, Sum, Avg, Lookup,
 )
 from django.db.transaction import atomic
+from django.dispatch import Signal
 from django.core.validators import FileExtensionValidator
 from django.core.files.base import ContentFile
+from django.db.models.fields.files import FieldFile
 from django.template import Context
 from django.template.loader import get_template
 from django.contrib.postgres.fields import ArrayField
@@ -41,19 +50,20 @@ from django.conf import settings
 from django.db.models.fields.json import KeyTransform
 
 from nacl_encrypted_fields.fields import NaClJSONField
-from picklefield.fields import PickledObjectField
 from cache_memoize import cache_memoize
 from hashids import Hashids
 from colorfield.fields import ColorField
 from mail_templated import send_mail
 from bitfield import BitField
-from django_celery_beat.models import PeriodicTask
 from psycopg2.extensions import register_adapter, AsIs
+from psycopg2.extras import execute_values
 
 from authlib.oauth2.rfc6749 import (
     ClientMixin, TokenMixin, AuthorizationCodeMixin,
 )
 
+from rest.entitlements import subscribed_channel_ids
+
 
 HASHIDS_LENGTH = 12
 MENU_ITEMS = [
@@ -67,6 +77,11 @@ MENU_ITEMS = [
     ('resume', 'Resume'),
     ('login', 'Login'),
 ]
+CRAWL_STATUSES = [
+    ('ok', 'ok'),
+    ('failed', 'failed'),
+    ('retry', 'retry'),
+]
 AUTH_TYPES = [
     ('password', 'password'),
     ('device_code', 'device_code'),
@@ -104,6 +119,12 @@ TOKEN_AUTH_METHODS = [
 LOGGER = logging.getLogger(__name__)
 LOGGER.addHandler(logging.NullHandler())
 
+# NOTE: bulk writes bypass save() and thus post_save, this signal is sent
+# instead with the (unsaved) instances that were created or updated.
+post_bulk_upsert = Signal()
+# NOTE: sent by TagManager.merge_to() in place of m2m_changed, once per sync.
+tags_changed = Signal()
+
 
 def grant_types_default():
     return [
@@ -128,12 +149,74 @@ def get_random_hour():
     return random.randint(0, 23)
 
 
+def get_crawl_interval(published, now=None):
+    """
+    Derive a crawl interval from recent publish dates (newest first). The
+    longer of the average gap between videos and the time since the last
+    one is scaled and clamped, so dormant channels are polled less often.
+    """
+    if not published:
+        return settings.CRAWL_INTERVAL_MAX
+
+    now = now or timezone.now()
+    idle = now - published[0]
+    cadence = idle
+    if len(published) > 1:
+        cadence = max(cadence, (published[0] - published[-1]) / (len(published) - 1))
+
+    interval = cadence * settings.CRAWL_INTERVAL_FACTOR
+    return min(
+        max(interval, settings.CRAWL_INTERVAL_MIN), settings.CRAWL_INTERVAL_MAX)
+
+
 def maybe_make_aware(dt):
     if timezone.is_aware(dt):
         return dt
     return timezone.make_aware(dt, timezone=timezone.utc)
 
 
+def _normalize(value):
+    if isinstance(value, datetime):
+        return maybe_make_aware(value).isoformat()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    return str(value)
+
+
+def fingerprint(data):
+    """
+    Stable hash of crawled data (a dataclass or plain JSON), used to detect
+    data that did not change since the last crawl.
+    """
+    if is_dataclass(data):
+        data = asdict(data)
+    normalized = json.dumps(
+        data, sort_keys=True, separators=(',', ':'), default=_normalize)
+    return hashlib.sha256(normalized.encode('utf8')).hexdigest()
+
+
+def video_fingerprint(data):
+    """
+    fingerprint() of the fields a crawl persists for a video, its tags and
+    sources included. The original payloads are left out, they carry counts
+    such as views and likes that change on every crawl.
+    """
+    data = asdict(data)
+    del data['original']
+    for source in data['sources']:
+        source.pop('original', None)
+    return fingerprint(data)
+
+
+def compress_metadata(data):
+    return zlib.compress(json.dumps(
+        data, separators=(',', ':'), default=_normalize).encode('utf8'))
+
+
+def decompress_metadata(data):
+    return json.loads(zlib.decompress(data).decode('utf8'))
+
+
 class PostgresDefaultValueType:
     pass
 
@@ -149,6 +232,22 @@ class SearchVectorField(BaseSearchVectorField):
         return PostgresDefaultValueType()
 
 
+# NOTE: field__any=ids compiles to "field" = ANY(%s), binding the ids as a
+# single array rather than one parameter per id as __in does.
+@models.IntegerField.register_lookup
+class AnyLookup(Lookup):
+    lookup_name = 'any'
+    prepare_rhs = False
+
+    def get_db_prep_lookup(self, value, connection):
+        return '%s', [list(value)]
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} = ANY({rhs}::bigint[])', lhs_params + rhs_params
+
+
 class HashidsQuerySet(models.QuerySet):
     def get(self, *args, **kwargs):
         uid = kwargs.pop('uid', None)
@@ -206,6 +305,253 @@ class CreatedUpdatedMixin(models.Model):
     updated = models.DateTimeField(auto_now=True)
 
 
+def _snapshot_value(value):
+    # NOTE: FieldFile compares equal to its name, and deep copying it would
+    # copy the instance it belongs to.
+    if isinstance(value, FieldFile):
+        return value.name
+    return deepcopy(value)
+
+
+class DirtyFieldsMixin:
+    """
+    Remembers field values as loaded from the database. Saving an existing
+    row only writes the columns that changed (plus auto_now columns), and
+    skips the query, and thus post_save, when nothing changed.
+    """
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot(field_names)
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        if fields is None:
+            fields = self._meta.concrete_fields
+        else:
+            # NOTE: fields may be names, attnames or prefetched relations.
+            fields = [self._meta.get_field(name) for name in fields]
+        self._snapshot([
+            f.attname for f in fields
+            if f.concrete and f.attname in self.__dict__
+        ])
+
+    def _snapshot(self, attnames):
+        loaded = self.__dict__.setdefault('_loaded_values', {})
+        for attname in attnames:
+            loaded[attname] = _snapshot_value(self.__dict__[attname])
+
+    def get_dirty_fields(self):
+        loaded = self.__dict__.get('_loaded_values', {})
+        dirty = []
+        for field in self._meta.concrete_fields:
+            if field.primary_key or getattr(field, 'auto_now', False):
+                continue
+            if field.attname not in self.__dict__:
+                # NOTE: deferred and never loaded, so never changed.
+                continue
+            if field.attname not in loaded or \
+               getattr(self, field.attname) != loaded[field.attname]:
+                dirty.append(field.attname)
+        return dirty
+
+    def save(self, *args, **kwargs):
+        if self._state.adding or kwargs.get('force_insert') or \
+           '_loaded_values' not in self.__dict__:
+            super().save(*args, **kwargs)
+            self._snapshot([
+                f.attname for f in self._meta.concrete_fields
+                if f.attname in self.__dict__
+            ])
+            return
+
+        dirty = self.get_dirty_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            names = {
+                self._meta.get_field(name).attname for name in update_fields
+            }
+            dirty = [attname for attname in dirty if attname in names]
+        if not dirty:
+            LOGGER.debug('Skipping save of unchanged %s', self)
+            return
+
+        auto_now = [
+            f.attname for f in self._meta.concrete_fields
+            if getattr(f, 'auto_now', False)
+        ]
+        kwargs['update_fields'] = dirty + auto_now
+        super().save(*args, **kwargs)
+        self._snapshot(kwargs['update_fields'])
+
+
+def upsert_rows(model, columns, rows, conflict, returning=('id',)):
+    """
+    Multi-row INSERT ... ON CONFLICT DO UPDATE for model. Rows are tuples of
+    values ordered like columns (attnames). Every column outside of the
+    conflict target is overwritten, except "created". Returns the returning
+    columns followed by a flag that is true for inserted rows.
+
+    If a "fingerprint" column is given, existing rows with a matching
+    fingerprint are not touched and not returned.
+    """
+    if not rows:
+        return []
+
+    fields = [model._meta.get_field(name) for name in columns]
+    rows = [
+        tuple(f.get_db_prep_save(v, connection) for f, v in zip(fields, row))
+        for row in rows
+    ]
+    names = ', '.join(f'"{f.column}"' for f in fields)
+    updates = ', '.join(
+        f'"{f.column}" = EXCLUDED."{f.column}"' for f in fields
+        if f.attname not in conflict and f.attname != 'created'
+    )
+    target = ', '.join(f'"{name}"' for name in conflict)
+    returning = ', '.join(f'"{name}"' for name in returning)
+    table = model._meta.db_table
+    where = ''
+    if 'fingerprint' in columns:
+        where = f'''
+        WHERE "{table}"."fingerprint" IS DISTINCT FROM EXCLUDED."fingerprint"'''
+    with connection.cursor() as c:
+        return execute_values(c, f'''
+        INSERT INTO "{table}" ({names})
+        VALUES %s
+        ON CONFLICT ({target}) DO
+        UPDATE SET {updates}{where}
+        RETURNING {returning}, ("xmax" = 0)''',
+            rows, page_size=len(rows), fetch=True)
+
+
+class MetadataBlobManager(models.Manager):
+    @atomic
+    def bulk_store(self, payloads):
+        """
+        Store compressed payloads ({digest: data}) that are not already
+        stored. Returns a dict mapping each digest to it's blob id. Only new
+        payloads are compressed and written.
+        """
+        if not payloads:
+            return {}
+
+        with connection.cursor() as c:
+            # NOTE: the lock keeps prune() from deleting a blob we are about
+            # to reference.
+            c.execute('''
+            SELECT "digest", "id" FROM "rest_metadatablob"
+            WHERE "digest" = ANY(%s)
+            FOR KEY SHARE''', [list(payloads)])
+            blob_ids = dict(c.fetchall())
+
+            missing = [
+                (timezone.now(), digest, compress_metadata(data))
+                for digest, data in payloads.items() if digest not in blob_ids
+            ]
+            if missing:
+                blob_ids.update(execute_values(c, '''
+                INSERT INTO "rest_metadatablob" ("created", "digest", "data")
+                VALUES %s
+                ON CONFLICT ("digest") DO
+                UPDATE SET "digest" = EXCLUDED."digest"
+                RETURNING "digest", "id"''',
+                    missing, page_size=len(missing), fetch=True))
+
+        return blob_ids
+
+    def prune(self):
+        """
+        Delete blobs no metadata row refers to any longer.
+        """
+        with connection.cursor() as c:
+            c.execute('''
+            DELETE FROM "rest_metadatablob" AS "blob"
+            WHERE NOT EXISTS (
+                SELECT 1 FROM "rest_channelmeta" WHERE "blob_id" = "blob"."id"
+            ) AND NOT EXISTS (
+                SELECT 1 FROM "rest_videometa" WHERE "blob_id" = "blob"."id"
+            ) AND NOT EXISTS (
+                SELECT 1 FROM "rest_videosourcemeta"
+                WHERE "blob_id" = "blob"."id"
+            )''')
+            return c.rowcount
+
+
+class MetadataBlob(models.Model):
+    """
+    Deduplicated, zlib compressed original crawler JSON, keyed by it's
+    fingerprint.
+    """
+    created = models.DateTimeField(auto_now_add=True)
+    digest = models.CharField(max_length=64, unique=True)
+    data = models.BinaryField()
+
+    objects = MetadataBlobManager()
+
+    def load(self):
+        return decompress_metadata(bytes(self.data))
+
+
+class MetadataManager(models.Manager):
+    @atomic
+    def bulk_set(self, metadata):
+        """
+        Upsert archival metadata for many objects. Accepts a dict mapping the
+        owning object's id to it's original JSON. Payloads are stored once
+        per fingerprint, rows that already point at the same payload are left
+        alone.
+        """
+        digests = {
+            owner_id: fingerprint(data)
+            for owner_id, data in metadata.items() if data is not None
+        }
+        blob_ids = MetadataBlob.objects.bulk_store({
+            digests[owner_id]: metadata[owner_id] for owner_id in digests
+        })
+
+        now = timezone.now()
+        rows = [
+            (now, now, owner_id, blob_ids[digest])
+            for owner_id, digest in digests.items()
+        ]
+        if not rows:
+            return
+
+        table = self.model._meta.db_table
+        column = self.model._meta.get_field(self.model.owner_field).column
+        with connection.cursor() as c:
+            execute_values(c, f'''
+            INSERT INTO "{table}"
+                ("created", "updated", "{column}", "blob_id")
+            VALUES %s
+            ON CONFLICT ("{column}") DO
+            UPDATE SET "updated" = EXCLUDED."updated",
+                       "blob_id" = EXCLUDED."blob_id"
+            WHERE "{table}"."blob_id" IS DISTINCT FROM EXCLUDED."blob_id"''',
+                rows, page_size=len(rows))
+
+
+class MetadataMixin(CreatedUpdatedMixin):
+    """
+    Original crawler JSON for an object. We don't often need it, it is kept
+    for archival purposes only and decompressed on access.
+    """
+    class Meta:
+        abstract = True
+
+    blob = models.ForeignKey(
+        MetadataBlob, related_name='+', on_delete=models.PROTECT,
+        editable=False)
+
+    objects = MetadataManager()
+
+    @cached_property
+    def metadata(self):
+        return self.blob.load()
+
+
 def build_query(s):
     # NOTE: Expand search query options here.
     # - support quotes for term queries.
@@ -255,6 +601,91 @@ class ManagerSearchMixin:
         return self.get_queryset().search(*args, **kwargs)
 
 
+class CounterManagerMixin:
+    """
+    Stored counters, maintained incrementally by adjust_counters() and
+    repaired by recount_counters() and reconcile_counters(). The model's
+    counters attribute maps each counter field to a SQL expression
+    recounting it for the row aliased "batch".
+    """
+    def adjust_counters(self, field, deltas):
+        """
+        Add deltas, a dict mapping pk to delta, to field in one statement.
+        """
+        # NOTE: relative so concurrent writers never lose updates, GREATEST
+        # so a delete racing a reconcile cannot go negative. Raw SQL since
+        # some querysets (tags) refuse update().
+        deltas = {pk: delta for pk, delta in deltas.items() if delta}
+        if not deltas:
+            return 0
+
+        table = self.model._meta.db_table
+        with connection.cursor() as c:
+            c.execute(f'''
+            UPDATE "{table}"
+            SET "{field}" = GREATEST("{table}"."{field}" + "d"."delta", 0)
+            FROM unnest(%s::bigint[], %s::bigint[]) AS "d" ("id", "delta")
+            WHERE "{table}"."id" = "d"."id"''',
+                [list(deltas), list(deltas.values())])
+            return c.rowcount
+
+    def recount_counters(self, ids):
+        """
+        Recount the counters of the given rows. Used where the change is
+        easier to recount than to express as a delta.
+        """
+        ids = list(ids)
+        if not ids:
+            return 0
+
+        return self._recount('''
+            SELECT "id" FROM "{table}" WHERE "id" = ANY(%s::bigint[])
+            ''', [ids])[1]
+
+    def reconcile_counters(self, after=0, limit=1000):
+        """
+        Recount the counters of up to limit rows with ids above after, and
+        write the ones that drifted. Returns the last id examined (None once
+        there are no more rows) and the number of rows repaired.
+        """
+        return self._recount('''
+            SELECT "id" FROM "{table}"
+            WHERE "id" > %s
+            ORDER BY "id"
+            LIMIT %s
+            ''', [after, limit])
+
+    def _recount(self, batch, params):
+        table = self.model._meta.db_table
+        counters = self.model.counters
+        counts = ', '.join(
+            f'({sql}) AS "{field}"' for field, sql in counters.items())
+        updates = ', '.join(
+            f'"{field}" = "counts"."{field}"' for field in counters)
+        stored = ', '.join(f'"{table}"."{field}"' for field in counters)
+        recounted = ', '.join(f'"counts"."{field}"' for field in counters)
+        batch = batch.format(table=table)
+
+        # NOTE: counts come from the statement's snapshot, a write landing
+        # meanwhile can leave a row off by one until the next pass.
+        with connection.cursor() as c:
+            c.execute(f'''
+            WITH "batch" AS ({batch}), "counts" AS (
+                SELECT "batch"."id", {counts} FROM "batch"
+            ), "repaired" AS (
+                UPDATE "{table}" SET {updates}
+                FROM "counts"
+                WHERE "{table}"."id" = "counts"."id"
+                AND ({stored}) IS DISTINCT FROM ({recounted})
+                RETURNING "{table}"."id"
+            )
+            SELECT
+                (SELECT MAX("id") FROM "batch"),
+                (SELECT COUNT(*) FROM "repaired")
+            ''', params)
+            return c.fetchone()
+
+
 class ChoiceArrayField(ArrayField):
     """
     A field that allows us to store an array of choices.
@@ -309,6 +740,148 @@ class ModuleAttributeField(models.CharField):
         return value
 
 
+# NOTE: first byte of a packed state, bump it and teach unpack_state() the
+# old version when the format changes.
+STATE_VERSION = 1
+STATE_EXT_DATETIME = 1
+STATE_EXT_DATE = 2
+STATE_EXT_SET = 3
+
+
+def _pack_state_ext(value):
+    if isinstance(value, datetime):
+        return msgpack.ExtType(
+            STATE_EXT_DATETIME, value.isoformat().encode('utf8'))
+    if isinstance(value, date):
+        return msgpack.ExtType(
+            STATE_EXT_DATE, value.isoformat().encode('utf8'))
+    if isinstance(value, (set, frozenset)):
+        return msgpack.ExtType(STATE_EXT_SET, pack_state(list(value))[1:])
+    raise TypeError(f'Cannot pack {type(value).__name__} into channel state')
+
+
+def _unpack_state_ext(code, data):
+    if code == STATE_EXT_DATETIME:
+        return datetime.fromisoformat(data.decode('utf8'))
+    if code == STATE_EXT_DATE:
+        return date.fromisoformat(data.decode('utf8'))
+    if code == STATE_EXT_SET:
+        return set(unpack_state(bytes([STATE_VERSION]) + data))
+    return msgpack.ExtType(code, data)
+
+
+def pack_state(value):
+    return bytes([STATE_VERSION]) + msgpack.packb(
+        value, default=_pack_state_ext, use_bin_type=True)
+
+
+def unpack_state(data):
+    if data[0] != STATE_VERSION:
+        raise ValueError(f'Unknown channel state version {data[0]}')
+    return msgpack.unpackb(
+        data[1:], ext_hook=_unpack_state_ext, raw=False,
+        strict_map_key=False)
+
+
+# NOTE: types JSON lacks are written as single key objects when editing
+# state, {"$set": [1, 2]} for example.
+STATE_JSON_TAGS = {
+    '$datetime': datetime.fromisoformat,
+    '$date': date.fromisoformat,
+    '$set': set,
+    '$map': dict,
+}
+
+
+def state_to_json(value):
+    if isinstance(value, datetime):
+        return {'$datetime': value.isoformat()}
+    if isinstance(value, date):
+        return {'$date': value.isoformat()}
+    if isinstance(value, (set, frozenset)):
+        return {'$set': [state_to_json(v) for v in sorted(value, key=repr)]}
+    if isinstance(value, dict):
+        if all(isinstance(key, str) for key in value):
+            return {key: state_to_json(v) for key, v in value.items()}
+        return {'$map': [
+            [state_to_json(key), state_to_json(v)]
+            for key, v in value.items()
+        ]}
+    if isinstance(value, (list, tuple)):
+        return [state_to_json(v) for v in value]
+    return value
+
+
+def _state_from_json(obj):
+    if len(obj) == 1:
+        tag, value = next(iter(obj.items()))
+        if tag in STATE_JSON_TAGS:
+            return STATE_JSON_TAGS[tag](
+                map(tuple, value) if tag == '$map' else value)
+    return obj
+
+
+def state_from_json(text):
+    return json.loads(text, object_hook=_state_from_json)
+
+
+class StateFormField(forms.CharField):
+    # NOTE: state is edited as JSON, see state_to_json().
+    widget = forms.Textarea
+
+    def prepare_value(self, value):
+        if value is None or isinstance(value, str):
+            return value
+        return json.dumps(state_to_json(value), indent=2)
+
+    def to_python(self, value):
+        if not value:
+            return None
+        try:
+            return state_from_json(value)
+
+        except (ValueError, TypeError) as e:
+            raise forms.ValidationError(f'Invalid state: {e}')
+
+
+class StateField(models.BinaryField):
+    """
+    Crawler state, stored as versioned msgpack rather than a pickle.
+    """
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('editable', True)
+        super().__init__(*args, **kwargs)
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return unpack_state(bytes(value))
+
+    def to_python(self, value):
+        if isinstance(value, str):
+            value = super().to_python(value)
+        if isinstance(value, (bytes, memoryview)):
+            return unpack_state(bytes(value))
+        return value
+
+    def get_prep_value(self, value):
+        if value is None:
+            return value
+        return pack_state(value)
+
+    def value_to_string(self, obj):
+        value = self.value_from_object(obj)
+        if value is None:
+            return value
+        return b64encode(pack_state(value)).decode('ascii')
+
+    def formfield(self, **kwargs):
+        return super(models.BinaryField, self).formfield(**{
+            'form_class': StateFormField,
+            **kwargs,
+        })
+
+
 class UserManager(HashidsManagerMixin, BaseUserManager):
     def create_user(self, email, password, **kwargs):
         kwargs.setdefault('is_active', False)
@@ -506,15 +1079,18 @@ class ChannelQuerySet(QuerySetSearchMixin, HashidsQuerySet):
     search_highlight_fields = ('name', 'title', 'description', 'url')
 
     def default_annotations(self):
-        return self.annotate(
-            n_videos=Count('videos'),
-            n_subscribers=Count('packages__subscriptions'),
-        )
+        # NOTE: n_videos and n_subscribers are stored on Channel.
+        return self
 
 
-class ChannelManager(ManagerSearchMixin, HashidsManager):
+class ChannelManager(CounterManagerMixin, ManagerSearchMixin, HashidsManager):
+    # NOTE: large columns only the crawler needs, use .defer(None) to load
+    # them.
+    deferred_fields = ('state', 'auth_params', 'description')
+
     def get_queryset(self):
-        return ChannelQuerySet(self.model, using=self._db)
+        return ChannelQuerySet(self.model, using=self._db) \
+            .defer(*self.deferred_fields)
 
     def default_annotations(self):
         return self.get_queryset().default_annotations()
@@ -528,6 +1104,27 @@ class ChannelManager(ManagerSearchMixin, HashidsManager):
             extern_id=extern_id, defaults=defaults)
         channel.set_metadata(original)
 
+    def claim_due(self, limit):
+        """
+        Claim up to limit channels that are due for a crawl. Claimed channels
+        are pushed out by their interval in the same statement, and locked
+        rows are skipped so concurrent ticks never claim the same channel.
+        Returns the claimed ids.
+        """
+        with connection.cursor() as c:
+            c.execute('''
+            UPDATE "rest_channel"
+            SET "next_crawl_at" = %(now)s + "crawl_interval"
+            WHERE "id" IN (
+                SELECT "id" FROM "rest_channel"
+                WHERE "next_crawl_at" IS NULL OR "next_crawl_at" <= %(now)s
+                ORDER BY "next_crawl_at" ASC NULLS FIRST
+                LIMIT %(limit)s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING "id"''', {'now': timezone.now(), 'limit': limit})
+            return [row[0] for row in c.fetchall()]
+
     def for_user(self, user, annotated=True, pre_fetch=False):
         queryset = self.all()
 
@@ -538,34 +1135,30 @@ class ChannelManager(ManagerSearchMixin, HashidsManager):
             queryset = queryset.filter(is_public=True)
 
         else:
-            # NOTE: we select all channels that relate to a package that the
-            # user subscribes to.        
-            subbed = Subscription.objects.filter(
-                package__channels__id=OuterRef('id'),
-                user=user
-            )
-
-            queryset = queryset.filter(Exists(subbed) | Q(is_public=True))
+            # NOTE: public channels and channels that relate to a package
+            # that the user subscribes to, see rest.entitlements.
+            queryset = queryset.filter(
+                Q(is_public=True) | Q(id__any=subscribed_channel_ids(user)))
 
         return queryset
 
 
-class Channel(HashidsModelMixin, CreatedUpdatedMixin, models.Model):
+class Channel(DirtyFieldsMixin, HashidsModelMixin, CreatedUpdatedMixin,
+              models.Model):
     class Meta:
         indexes = [
-            GinIndex(fields=['search'])
+            GinIndex(fields=['search']),
+            models.Index(fields=['name', 'id']),
+            models.Index(fields=['n_videos']),
         ]
 
     user = models.ForeignKey(
         User, related_name='channels', on_delete=models.CASCADE)
-    task = models.ForeignKey(
-        PeriodicTask, null=True, blank=True, related_name='channel',
-        on_delete=models.CASCADE)
     packages = models.ManyToManyField(Package, related_name='channels')
     extern_id = models.CharField(max_length=128, unique=True)
     options = BitField(flags=[])
     url = models.URLField()
-    state = PickledObjectField(null=True, blank=True, editable=True)
+    state = StateField(null=True, blank=True)
     auth_params = models.JSONField(null=True, blank=True)
     is_public = models.BooleanField(default=False)
     name = models.CharField(max_length=64)
@@ -573,21 +1166,54 @@ class Channel(HashidsModelMixin, CreatedUpdatedMixin, models.Model):
     description = models.TextField(null=True, blank=True)
     poster = models.ImageField(null=True, blank=True)
     search = SearchVectorField(null=True)
+    crawled = models.DateTimeField(null=True, blank=True, editable=False)
+    crawl_interval = models.DurationField(default=timedelta(hours=4))
+    next_crawl_at = models.DateTimeField(
+        null=True, blank=True, db_index=True)
+    # NOTE: maintained by rest.signals.
+    n_videos = models.PositiveIntegerField(default=0, editable=False)
+    n_subscribers = models.PositiveIntegerField(default=0, editable=False)
 
     objects = ChannelManager()
 
+    counters = {
+        'n_videos': 'SELECT COUNT(*) FROM "rest_video" '
+                    'WHERE "channel_id" = "batch"."id"',
+        'n_subscribers': 'SELECT COUNT(*) FROM "rest_subscription" "s" '
+                         'JOIN "rest_channel_packages" "p" '
+                         'ON "p"."package_id" = "s"."package_id" '
+                         'WHERE "p"."channel_id" = "batch"."id"',
+    }
+
     def __str__(self):
         return self.name
 
+    @property
+    def host(self):
+        host = (urlparse(self.url).hostname or '').lower()
+        return host.removeprefix('www.')
+
     def set_metadata(self, metadata=None):
         if metadata is None:
             return
 
-        ChannelMeta.update_or_create(
-            video=self, defaults={'metadata': metadata})
+        ChannelMeta.objects.bulk_set({self.id: metadata})
 
     def update(self, **kwargs):
         Channel.objects.filter(id=self.id).update(**kwargs)
+
+    def schedule_crawl(self, now=None, **kwargs):
+        # NOTE: kwargs are written in the same update, see update_channel.
+        now = now or timezone.now()
+        published = self.videos \
+            .order_by('-published') \
+            .values_list('published', flat=True)[:settings.CRAWL_CADENCE_SAMPLE]
+        self.crawl_interval = get_crawl_interval(list(published), now)
+        self.next_crawl_at = now + self.crawl_interval
+        self.update(
+            crawl_interval=self.crawl_interval,
+            next_crawl_at=self.next_crawl_at,
+            **kwargs)
     
     def from_dataclass(self, data):
         defaults = asdict(data)
@@ -603,18 +1229,90 @@ class Channel(HashidsModelMixin, CreatedUpdatedMixin, models.Model):
         self.set_metadata(original)
 
 
-class ChannelMeta(CreatedUpdatedMixin, models.Model):
-    # We don't often need the orignal JSON data, it is kept here for archival
-    # purposes only in order to not bloat the base table.
+class ChannelMeta(MetadataMixin):
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['channel'], name='rest_channelmeta_channel_uniq'),
+        ]
+
     channel = models.ForeignKey(
         Channel, related_name='meta', on_delete=models.CASCADE)
-    metadata = models.JSONField()
+
+    owner_field = 'channel'
+
+
+class CrawlManager(models.Manager):
+    def summary(self, since):
+        """
+        Totals of crawls started since the given time, per status.
+        """
+        return self \
+            .filter(started__gte=since) \
+            .values('status') \
+            .annotate(
+                crawls=Count('id'),
+                wall_time=Sum('wall_time'),
+                fetch_time=Sum('fetch_time'),
+                db_time=Sum('db_time'),
+                videos_created=Sum('videos_created'),
+                videos_updated=Sum('videos_updated'),
+                videos_unchanged=Sum('videos_unchanged'),
+                queries=Sum('queries'),
+                retries=Sum('retries')) \
+            .order_by('status')
+
+    def slowest(self, since, limit):
+        """
+        Channels with the highest average crawl wall time since the given
+        time.
+        """
+        return self \
+            .filter(started__gte=since) \
+            .values('channel_id', 'channel__name') \
+            .annotate(
+                crawls=Count('id'),
+                wall_time=Avg('wall_time'),
+                queries=Avg('queries')) \
+            .order_by('-wall_time')[:limit]
+
+
+class Crawl(models.Model):
+    """
+    Telemetry for one crawl of a channel. Times are in seconds, fetch_time
+    is spent waiting on the video host, db_time is everything else (SQL
+    and serialization).
+    """
+    class Meta:
+        indexes = [
+            models.Index(fields=['channel', '-started']),
+            models.Index(fields=['started']),
+        ]
+
+    channel = models.ForeignKey(
+        Channel, related_name='crawls', on_delete=models.CASCADE)
+    started = models.DateTimeField(default=timezone.now)
+    status = models.CharField(max_length=8, choices=CRAWL_STATUSES)
+    backfill = models.BooleanField(default=False)
+    wall_time = models.FloatField(default=0)
+    fetch_time = models.FloatField(default=0)
+    db_time = models.FloatField(default=0)
+    videos_created = models.PositiveIntegerField(default=0)
+    videos_updated = models.PositiveIntegerField(default=0)
+    videos_unchanged = models.PositiveIntegerField(default=0)
+    queries = models.PositiveIntegerField(default=0)
+    retries = models.PositiveSmallIntegerField(default=0)
+
+    objects = CrawlManager()
+
+    def __str__(self):
+        return f'{self.channel_id} @ {self.started}'
 
 
 class TagQuerySet(HashidsQuerySet):
     def default_annotations(self):
-        queryset = self.annotate(n_tagged=Count('tagged'))
-        return queryset
+        # NOTE: n_tagged is stored on Tag.
+        return self
 
     # NOTE: read-only model, should not be modified once created.
     def update(self, *args, **kwargs):
@@ -624,17 +1322,62 @@ class TagQuerySet(HashidsQuerySet):
         raise NotImplementedError('Tags are immutable.')
 
 
-class TagManager(HashidsManager):   
+class TagManager(CounterManagerMixin, HashidsManager):
     def get_queryset(self):
         return TagQuerySet(self.model, using=self._db)
 
     def default_annotations(self):
         return self.get_queryset().default_annotations()
 
+    def upsert_names(self, names):
+        """
+        Create any missing tags, usually in a single statement. Returns a dict
+        mapping casefolded names to tag ids.
+        """
+        # NOTE: the name column uses a case-insensitive collation, so dedupe
+        # the same way before matching names back to ids.
+        names = {name.casefold(): name for name in names}
+        if not names:
+            return {}
+
+        with connection.cursor() as c:
+            c.execute('''
+            WITH "inserted" AS (
+                INSERT INTO "rest_tag" ("name")
+                SELECT unnest(%(names)s::text[])
+                ON CONFLICT ("name") DO NOTHING
+                RETURNING "id", "name"
+            )
+            SELECT "id", "name" FROM "inserted"
+            UNION ALL
+            SELECT "id", "name" FROM "rest_tag"
+            WHERE "name" = ANY(%(names)s::text[])''',
+                {'names': list(names.values())})
+            tag_ids = {name.casefold(): id for id, name in c.fetchall()}
+
+            # NOTE: a tag committed by a concurrent insert is skipped by the
+            # insert yet invisible to the select. The no-op update returns
+            # it, only used for these as it writes a new row version.
+            missing = [
+                name for key, name in names.items() if key not in tag_ids
+            ]
+            if missing:
+                c.execute('''
+                INSERT INTO "rest_tag" ("name")
+                SELECT unnest(%s::text[])
+                ON CONFLICT ("name") DO
+                UPDATE SET "name" = "rest_tag"."name"
+                RETURNING "id", "name"''', [missing])
+                tag_ids.update(
+                    (name.casefold(), id) for id, name in c.fetchall())
+
+        return tag_ids
+
     def add_to(self, obj, tags):
-        for name in tags:
-            obj.tags.add(self.get_or_create(name=name)[0].pk)
-            LOGGER.debug('Added tag %s to %s', name, obj)
+        tags = list(tags)
+        tag_ids = self.upsert_names(tags)
+        obj.tags.add(*tag_ids.values())
+        LOGGER.debug('Added tags %s to %s', ', '.join(tags), obj)
 
     def remove_from(self, obj, tags=None):
         if tags is None:
@@ -642,32 +1385,80 @@ class TagManager(HashidsManager):
             LOGGER.debug('Removed all tags from %s', obj)
             return
 
-        for name in tags:
-            try:
-                obj.tags.remove(Tag.objects.get(name=name))
-            except Tag.DoesNotExist:
-                pass
-            else:
-                LOGGER.debug('Removed tag %s from %s', name, obj)
+        obj.tags.remove(*self.filter(name__in=tags))
+        LOGGER.debug('Removed tags %s from %s', ', '.join(tags), obj)
 
     def merge_to(self, obj, tags=None):
-        if tags is None:
-            obj.tags.clear()
-            LOGGER.debug('Removed all tags from %s', obj)
-            return
+        """
+        Replace obj's tags with tags, None removes them all. Sends
+        tags_changed once if anything changed.
+        """
+        if self.bulk_merge_to({obj.id: tags or ()}):
+            LOGGER.debug('Merged tags to %s', obj)
+            tags_changed.send(sender=obj.__class__, instances=[obj])
+
+    def bulk_merge_to(self, tagged):
+        """
+        Set-based version of merge_to() for many videos. Accepts a dict mapping
+        video id to tag names. Tags are upserted in one statement and the
+        through table is synced with one insert and one delete. Returns the
+        ids of videos whose tags changed, no signals are sent.
+        """
+        if not tagged:
+            return set()
+
+        tag_ids = self.upsert_names(
+            name for tags in tagged.values() for name in tags or ())
+
+        video_ids, keep_video_ids, keep_tag_ids = list(tagged), [], []
+        for video_id, tags in tagged.items():
+            for key in {name.casefold() for name in tags or ()}:
+                keep_video_ids.append(video_id)
+                keep_tag_ids.append(tag_ids[key])
+
+        n_tagged = Counter()
+        with connection.cursor() as c:
+            c.execute('''
+            INSERT INTO "rest_video_tags" ("video_id", "tag_id")
+            SELECT * FROM unnest(%s::bigint[], %s::bigint[])
+            ON CONFLICT DO NOTHING
+            RETURNING "video_id", "tag_id"''', [keep_video_ids, keep_tag_ids])
+            added = c.fetchall()
+            c.execute('''
+            DELETE FROM "rest_video_tags"
+            WHERE "video_id" = ANY(%s::bigint[])
+            AND ("video_id", "tag_id") NOT IN (
+                SELECT * FROM unnest(%s::bigint[], %s::bigint[])
+            )
+            RETURNING "video_id", "tag_id"''',
+                [video_ids, keep_video_ids, keep_tag_ids])
+            removed = c.fetchall()
 
-        e, n = set(obj.tags.all().values_list('name', flat=True)), set(tags)
+        n_tagged.update(tag_id for _, tag_id in added)
+        n_tagged.subtract(tag_id for _, tag_id in removed)
+        self.adjust_counters('n_tagged', n_tagged)
 
-        self.add_to(obj, n.difference(e))
-        self.remove_from(obj, e.difference(n))
+        return {video_id for video_id, _ in added + removed}
 
 
 class Tag(HashidsModelMixin, models.Model):
+    class Meta:
+        indexes = [
+            models.Index(fields=['n_tagged']),
+        ]
+
     name = models.TextField(
         max_length=32, null=False, unique=True, db_collation='ci')
+    # NOTE: maintained by TagManager.bulk_merge_to() and rest.signals.
+    n_tagged = models.PositiveIntegerField(default=0, editable=False)
 
     objects = TagManager()
 
+    counters = {
+        'n_tagged': 'SELECT COUNT(*) FROM "rest_video_tags" '
+                    'WHERE "tag_id" = "batch"."id"',
+    }
+
     def __str__(self):
         return self.name
 
@@ -698,6 +1489,41 @@ class TermManager(ManagerSearchMixin, HashidsManager):
             UPDATE SET "freq" = "rest_term"."freq" + %(freq)s
             WHERE "rest_term"."ngram" = %(ngram)s''', terms)
 
+    def apply_deltas(self, deltas):
+        """
+        Add signed frequency changes ({ngram: delta}) to terms in a single
+        statement. Existing terms are updated (never below zero), new terms
+        with a positive delta are inserted. Terms left at zero are removed
+        by compact().
+        """
+        if not deltas:
+            return
+
+        with connection.cursor() as c:
+            execute_values(c, '''
+            WITH "delta" ("ngram", "freq") AS (VALUES %s),
+            "updated" AS (
+                UPDATE "rest_term"
+                SET "freq" = GREATEST("rest_term"."freq" + "delta"."freq", 0)
+                FROM "delta"
+                WHERE "rest_term"."ngram" = "delta"."ngram"
+                RETURNING "rest_term"."ngram"
+            )
+            INSERT INTO "rest_term" ("ngram", "freq")
+            SELECT "ngram", "freq" FROM "delta"
+            WHERE "freq" > 0 AND NOT EXISTS (
+                SELECT 1 FROM "updated"
+                WHERE "updated"."ngram" = "delta"."ngram"
+            )
+            ON CONFLICT ("ngram") DO
+            UPDATE SET "freq" = "rest_term"."freq" + EXCLUDED."freq"''',
+                list(deltas.items()), template='(%s, %s::integer)',
+                page_size=len(deltas))
+
+    def compact(self, min_freq=1):
+        deleted, _ = self.filter(freq__lt=min_freq).delete()
+        return deleted
+
 
 class Term(HashidsModelMixin, models.Model):
     class Meta:
@@ -715,39 +1541,91 @@ class Term(HashidsModelMixin, models.Model):
         return self.ngram
 
 
-class VideoQuerySet(QuerySetSearchMixin, HashidsQuerySet):
-    search_highlight_fields = ('title', 'description')
+class TermSourceManager(models.Manager):
+    @atomic
+    def update_terms(self, model, ngrams):
+        """
+        Record the ngram counts extracted from objects ({object_id: Counter})
+        and apply the difference from the previously recorded counts to Term.
+        Objects missing from ngrams or with no ngrams are removed, which
+        subtracts everything they contributed.
+
+        NOTE: Term.ngram is case insensitive, so differences are summed by
+        casefolded ngram to avoid touching the same row twice.
+        """
+        model_name = model._meta.model_name
+        object_ids = sorted(ngrams)
+        # NOTE: SELECT ... FOR UPDATE only locks rows that exist. Inserting
+        # the missing ones first gives every object a row to lock, so two
+        # workers indexing a new object apply its counts one after the other
+        # rather than both from nothing. Sorted ids keep the lock order.
+        with connection.cursor() as c:
+            c.execute(f'''
+            INSERT INTO "{self.model._meta.db_table}"
+                ("model", "object_id", "ngrams")
+            SELECT %s, "object_id", '{{}}'::jsonb
+            FROM unnest(%s::bigint[]) AS "ids" ("object_id")
+            ON CONFLICT ("model", "object_id") DO NOTHING''', [
+                model_name, object_ids,
+            ])
+        old = self \
+            .select_for_update() \
+            .filter(model=model_name, object_id__in=object_ids) \
+            .order_by('object_id') \
+            .values_list('object_id', 'ngrams')
+
+        spelling, deltas = {}, Counter()
+        for object_id, counts in old:
+            for ngram, freq in counts.items():
+                spelling.setdefault(ngram.casefold(), ngram)
+                deltas[ngram.casefold()] -= freq
+        for counts in ngrams.values():
+            for ngram, freq in counts.items():
+                spelling[ngram.casefold()] = ngram
+                deltas[ngram.casefold()] += freq
+
+        Term.objects.apply_deltas({
+            spelling[key]: delta for key, delta in deltas.items() if delta
+        })
+
+        self.filter(model=model_name, object_id__in=[
+            object_id for object_id, counts in ngrams.items() if not counts
+        ]).delete()
+        upsert_rows(self.model, ('model', 'object_id', 'ngrams'), [
+            (model_name, object_id, dict(counts))
+            for object_id, counts in ngrams.items() if counts
+        ], conflict=('model', 'object_id'))
+
+
+class TermSource(models.Model):
+    """
+    The ngram counts an object last contributed to Term, so re-indexing it
+    only applies the difference.
+    """
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['model', 'object_id'],
+                name='rest_termsource_object_uniq'),
+        ]
 
-    def default_annotations(self, user=None):
-        queryset = self.annotate(
-                n_plays=Count('plays'),
-                n_likes=Count('likes'),
-                n_dislikes=Count('dislikes'),
-            )
+    model = models.CharField(max_length=32)
+    object_id = models.BigIntegerField()
+    ngrams = models.JSONField(default=dict)
 
-        if user and user.is_authenticated:
-            queryset = queryset.annotate(
-                is_played=Exists(
-                    Play.objects.filter(
-                        video_id=OuterRef('pk'),
-                        user=user)
-                ),
-                is_liked=Exists(
-                    Like.objects.filter(
-                        video_id=OuterRef('pk'),
-                        user=user)
-                ),
-                is_disliked=Exists(
-                    Dislike.objects.filter(
-                        video_id=OuterRef('pk'),
-                        user=user)
-                ),
-            )
+    objects = TermSourceManager()
 
-        return queryset
 
+class VideoQuerySet(QuerySetSearchMixin, HashidsQuerySet):
+    search_highlight_fields = ('title', 'description')
+
+    def default_annotations(self):
+        # NOTE: n_plays, n_likes and n_dislikes are stored on Video, per user
+        # fields are filled in after pagination by VideoManager.personalize().
+        return self
 
-class VideoManager(ManagerSearchMixin, HashidsManager):
+
+class VideoManager(CounterManagerMixin, ManagerSearchMixin, HashidsManager):
     def get_queryset(self):
         return VideoQuerySet(
             model=self.model, using=self._db, hints=self._hints)
@@ -755,9 +1633,67 @@ class VideoManager(ManagerSearchMixin, HashidsManager):
     def default_annotations(self):
         return self.get_queryset().default_annotations()
 
+    def personalize(self, videos, user):
+        """
+        Set the per user fields (is_played, is_liked, is_disliked and the
+        play cursor) on videos, typically a page, in a single query.
+        """
+        if not videos or not user.is_authenticated:
+            return videos
+
+        # NOTE: the page's ids drive the lookups, so the cost depends on the
+        # page size rather than on the listing.
+        with connection.cursor() as c:
+            c.execute('''
+            SELECT
+                "v"."id",
+                EXISTS(
+                    SELECT 1 FROM "rest_play"
+                    WHERE "video_id" = "v"."id" AND "user_id" = %(user_id)s
+                ),
+                EXISTS(
+                    SELECT 1 FROM "rest_like"
+                    WHERE "video_id" = "v"."id" AND "user_id" = %(user_id)s
+                ),
+                EXISTS(
+                    SELECT 1 FROM "rest_dislike"
+                    WHERE "video_id" = "v"."id" AND "user_id" = %(user_id)s
+                ),
+                (
+                    SELECT "cursor"::text FROM "rest_playcursor"
+                    WHERE "video_id" = "v"."id" AND "user_id" = %(user_id)s
+                )
+            FROM unnest(%(ids)s::bigint[]) AS "v" ("id")''', {
+                'user_id': user.id,
+                'ids': list({video.id for video in videos}),
+            })
+            fields = {row[0]: row[1:] for row in c.fetchall()}
+
+        for video in videos:
+            played, liked, disliked, cursor = fields[video.id]
+            video.is_played = played
+            video.is_liked = liked
+            video.is_disliked = disliked
+            video.cursor = None if cursor is None else json.loads(cursor)
+        return videos
+
     def from_dataclass(self, channel, data):
+        """
+        Create or update a video from crawled data. Returns the video and
+        whether it was created, created is None if the data is unchanged
+        since the last crawl and nothing was written.
+        """
         defaults = asdict(data)
         extern_id = defaults.pop('extern_id')
+        defaults['fingerprint'] = video_fingerprint(data)
+
+        try:
+            return self.get(
+                channel=channel, extern_id=extern_id,
+                fingerprint=defaults['fingerprint']), None
+
+        except Video.DoesNotExist:
+            pass
 
         # Used later in separate models.
         tags = defaults.pop('tags')
@@ -777,22 +1713,85 @@ class VideoManager(ManagerSearchMixin, HashidsManager):
 
         return video, created
 
+    @atomic
+    def bulk_from_dataclass(self, channel, datas):
+        """
+        Batched version of from_dataclass(). Videos, tags, sources and
+        metadata for the whole batch are written using a few multi-row
+        statements. Returns lists of created and updated video ids and the
+        extern ids of videos skipped because their data was unchanged.
+        """
+        now = timezone.now()
+        videos, tags, originals, sources = {}, {}, {}, {}
+        for data in datas:
+            defaults = asdict(data)
+            extern_id = defaults.pop('extern_id')
+            defaults['fingerprint'] = video_fingerprint(data)
+
+            # Used later in separate models.
+            tags[extern_id] = defaults.pop('tags')
+            originals[extern_id] = defaults.pop('original')
+            # Must be handled specially
+            del defaults['sources']
+            sources[extern_id] = data.sources
+
+            # Convert naive datetime to UTC
+            defaults['published'] = maybe_make_aware(defaults['published'])
+
+            # NOTE: a crawler can yield the same video twice, ON CONFLICT
+            # cannot touch the same row twice so the last one wins.
+            videos[extern_id] = defaults
+
+        if not videos:
+            return [], [], []
+
+        columns = ['created', 'updated', 'channel_id', 'extern_id']
+        columns.extend(next(iter(videos.values())))
+        rows = [
+            (now, now, channel.id, extern_id, *defaults.values())
+            for extern_id, defaults in videos.items()
+        ]
+        upserted = upsert_rows(
+            self.model, columns, rows, conflict=('extern_id',),
+            returning=('id', 'extern_id'))
+
+        ids, created, updated = {}, [], []
+        for video_id, extern_id, inserted in upserted:
+            ids[extern_id] = video_id
+            (created if inserted else updated).append(video_id)
+        unchanged = [extern_id for extern_id in videos if extern_id not in ids]
+
+        # NOTE: only videos that were written need their related rows synced.
+        Tag.objects.bulk_merge_to({
+            ids[extern_id]: tags[extern_id] for extern_id in ids
+        })
+        VideoMeta.objects.bulk_set({
+            ids[extern_id]: originals[extern_id] for extern_id in ids
+        })
+        VideoSource.objects.bulk_from_dataclass({
+            ids[extern_id]: sources[extern_id] for extern_id in ids
+        })
+
+        post_bulk_upsert.send(sender=self.model, created=created, instances=[
+            self.model(id=ids[extern_id], channel=channel, **videos[extern_id])
+            for extern_id in ids
+        ])
+
+        return created, updated, unchanged
+
     def for_user(self, user, annotated=False, pre_fetch=False):
         queryset = self.all()
 
         if annotated:
-            queryset = queryset.default_annotations(user=user)
+            queryset = queryset.default_annotations()
 
         if not user.is_authenticated:
             queryset = queryset.filter(channel__is_public=True)
 
         else:
-            subbed = Subscription.objects.filter(
-                package__channels__id=OuterRef('channel_id'),
-                user=user
-            )
-
-            queryset = queryset.filter(Exists(subbed) | Q(channel__is_public=True))
+            queryset = queryset.filter(
+                Q(channel__is_public=True)
+                | Q(channel__id__any=subscribed_channel_ids(user)))
 
         if pre_fetch:
             queryset = queryset \
@@ -801,18 +1800,20 @@ class VideoManager(ManagerSearchMixin, HashidsManager):
                 .prefetch_related('tags') \
                 .order_by('-published')
 
-            if user.is_authenticated:
-                queryset = queryset.annotate(cursor=Subquery(
-                    PlayCursor.objects.filter(user=user, video_id=OuterRef('id')).values('cursor')
-                ))
-        
         return queryset
 
 
-class Video(HashidsModelMixin, CreatedUpdatedMixin, models.Model):
+class Video(DirtyFieldsMixin, HashidsModelMixin, CreatedUpdatedMixin,
+            models.Model):
     class Meta:
         indexes = [
             GinIndex(fields=['search']),
+            # NOTE: keyset pagination of listings, see rest.pagination.
+            models.Index(fields=['published', 'id']),
+            models.Index(fields=['channel', 'published', 'id']),
+            models.Index(fields=['n_plays']),
+            models.Index(fields=['n_likes']),
+            models.Index(fields=['n_dislikes']),
         ]
 
     tags = models.ManyToManyField(Tag, related_name='tagged', blank=True)
@@ -825,31 +1826,45 @@ class Video(HashidsModelMixin, CreatedUpdatedMixin, models.Model):
     duration = models.PositiveIntegerField()
     published = models.DateTimeField(default=timezone.now)
     search = SearchVectorField(null=True)
+    fingerprint = models.CharField(
+        max_length=64, null=True, blank=True, editable=False)
+    # NOTE: maintained by rest.signals, the columns have a database default
+    # for the crawler's raw INSERTs.
+    n_plays = models.PositiveIntegerField(default=0, editable=False)
+    n_likes = models.PositiveIntegerField(default=0, editable=False)
+    n_dislikes = models.PositiveIntegerField(default=0, editable=False)
 
     objects = VideoManager()
 
+    counters = {
+        'n_plays': 'SELECT COUNT(*) FROM "rest_play" '
+                   'WHERE "video_id" = "batch"."id"',
+        'n_likes': 'SELECT COUNT(*) FROM "rest_like" '
+                   'WHERE "video_id" = "batch"."id"',
+        'n_dislikes': 'SELECT COUNT(*) FROM "rest_dislike" '
+                      'WHERE "video_id" = "batch"."id"',
+    }
+
     def __str__(self):
         return self.title
 
     def set_metadata(self, metadata=None):
         if metadata is None:
             return
-        VideoMeta.objects.update_or_create(
-            video=self, defaults={'metadata': metadata})
+        VideoMeta.objects.bulk_set({self.id: metadata})
 
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        for src in self.sources.all():
-            src.video_id = self.id
-            src.save()
 
+class VideoMeta(MetadataMixin):
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['video'], name='rest_videometa_video_uniq'),
+        ]
 
-class VideoMeta(CreatedUpdatedMixin, models.Model):
-    # We don't often need the orignal JSON data, it is kept here for archival
-    # purposes only in order to not bloat the base table.
     video = models.ForeignKey(
         Video, related_name='meta', on_delete=models.CASCADE)
-    metadata = models.JSONField()
+
+    owner_field = 'video'
 
 
 class VideoSourceManager(HashidsManager):
@@ -859,11 +1874,25 @@ class VideoSourceManager(HashidsManager):
         except:
             datas = [datas]
         
+        if not datas:
+            return
+
+        # NOTE: one query for the video's sources rather than one per source.
+        existing = {
+            (extern_id, url): digest
+            for extern_id, url, digest in self
+            .filter(video=video)
+            .values_list('extern_id', 'url', 'fingerprint')
+        }
         for data in datas:
             defaults = asdict(data)
             original = defaults.pop('original')
             extern_id = defaults.pop('extern_id')
             url = defaults.pop('url')
+            defaults['fingerprint'] = fingerprint(data)
+
+            if existing.get((extern_id, url)) == defaults['fingerprint']:
+                continue
 
             video_source, created = VideoSource.objects.update_or_create(
                 video=video,
@@ -873,8 +1902,43 @@ class VideoSourceManager(HashidsManager):
             )
             video_source.set_metadata(original)
 
-
-class VideoSource(HashidsModelMixin, CreatedUpdatedMixin, models.Model):
+    def bulk_from_dataclass(self, sources):
+        """
+        Batched version of from_dataclass(). Accepts a dict mapping video id
+        to that video's source dataclasses.
+        """
+        now = timezone.now()
+        rows, originals, columns = {}, {}, None
+        for video_id, datas in sources.items():
+            for data in datas or ():
+                defaults = asdict(data)
+                original = defaults.pop('original')
+                extern_id = defaults.pop('extern_id')
+                url = defaults.pop('url')
+                defaults['fingerprint'] = fingerprint(data)
+
+                if columns is None:
+                    columns = [
+                        'created', 'updated', 'video_id', 'extern_id', 'url',
+                        *defaults,
+                    ]
+                rows[video_id, extern_id] = (
+                    now, now, video_id, extern_id, url, *defaults.values())
+                originals[video_id, extern_id] = original
+
+        upserted = upsert_rows(
+            self.model, columns, list(rows.values()),
+            conflict=('video_id', 'extern_id'),
+            returning=('id', 'video_id', 'extern_id'))
+
+        VideoSourceMeta.objects.bulk_set({
+            source_id: originals[video_id, extern_id]
+            for source_id, video_id, extern_id, _ in upserted
+        })
+
+
+class VideoSource(DirtyFieldsMixin, HashidsModelMixin, CreatedUpdatedMixin,
+                  models.Model):
     class Meta:
         unique_together = [
             ('video', 'extern_id'),
@@ -890,6 +1954,8 @@ class VideoSource(HashidsModelMixin, CreatedUpdatedMixin, models.Model):
     size = models.PositiveBigIntegerField(null=True, blank=True)
     mime = models.CharField(max_length=64, null=True, blank=True)
     url = models.URLField(max_length=256)
+    fingerprint = models.CharField(
+        max_length=64, null=True, blank=True, editable=False)
 
     objects = VideoSourceManager()
 
@@ -899,8 +1965,7 @@ class VideoSource(HashidsModelMixin, CreatedUpdatedMixin, models.Model):
     def set_metadata(self, metadata=None):
         if metadata is None:
             return
-        VideoSourceMeta.objects.update_or_create(
-            video_source=self, defaults={'metadata': metadata})
+        VideoSourceMeta.objects.bulk_set({self.id: metadata})
 
     @property
     def dimension(self):
@@ -909,12 +1974,18 @@ class VideoSource(HashidsModelMixin, CreatedUpdatedMixin, models.Model):
         return f'{width}{height}'
 
 
-class VideoSourceMeta(CreatedUpdatedMixin, models.Model):
-    # We don't often need the orignal JSON data, it is kept here for archival
-    # purposes only in order to not bloat the base table.
+class VideoSourceMeta(MetadataMixin):
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['video_source'],
+                name='rest_videosourcemeta_video_source_uniq'),
+        ]
+
     video_source = models.ForeignKey(
         VideoSource, related_name='meta', on_delete=models.CASCADE)
-    metadata = models.JSONField()
+
+    owner_field = 'video_source'
 
 
 class Subscription(HashidsModelMixin, CreatedUpdatedMixin, models.Model):
@@ -0,0 +1,182 @@
+import json
+import binascii
+
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from collections import OrderedDict
+from datetime import date
+from decimal import Decimal
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def flip(key):
+    return key[1:] if key.startswith('-') else f'-{key}'
+
+
+def encode_value(value):
+    # NOTE: full precision, a truncated timestamp would skip or repeat rows.
+    if isinstance(value, date):
+        return value.isoformat()
+
+    if isinstance(value, Decimal):
+        return str(value)
+
+    return value
+
+
+class HybridPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination that switches to keyset pagination when the
+    request has a cursor parameter (empty for the first page).
+
+    Keyset pages seek past the last row of the previous page using the
+    ordering keys, so a deep page costs the same as the first one. Rows are
+    ordered by the queryset's ordering (for example from a filterset's
+    OrderingFilter), or the view's keyset_ordering when unordered, with id
+    as tie breaker. Keyset responses have no count, counting would scan
+    the whole listing.
+
+    Orderings that cannot be read back from the rows (expressions, related
+    fields) fall back to limit/offset.
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_ordering(self, queryset, view):
+        ordering = list(queryset.query.order_by) or \
+            list(getattr(view, 'keyset_ordering', ()))
+        if not all(
+                isinstance(key, str) and '__' not in key and key != '?'
+                for key in ordering):
+            return None
+
+        if not any(key.lstrip('-') in ('id', 'pk') for key in ordering):
+            descending = ordering and ordering[-1].startswith('-')
+            ordering.append('-id' if descending else 'id')
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.ordering = self.get_ordering(queryset, view)
+        self.keyset = self.ordering is not None \
+            and self.cursor_query_param in request.query_params \
+            and self.offset_query_param not in request.query_params
+
+        if self.ordering is not None:
+            queryset = queryset.order_by(*self.ordering)
+
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            self.limit = self.max_limit or self.default_limit
+        position, reverse = self.decode_cursor(request)
+
+        ordering = [flip(key) for key in self.ordering] \
+            if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.seek(ordering, position))
+
+        page = list(queryset[:self.limit + 1])
+        has_more = len(page) > self.limit
+        page = page[:self.limit]
+        if reverse:
+            page.reverse()
+
+        self.next_position = self.previous_position = None
+        if page:
+            # NOTE: paging backwards starts from a page known to follow.
+            if has_more or reverse:
+                self.next_position = self.position(page[-1])
+            if (has_more and reverse) or (position and not reverse):
+                self.previous_position = self.position(page[0])
+        return page
+
+    def seek(self, ordering, position):
+        """
+        Rows after position. The redundant bound on the first key lets
+        the database start an index scan at position rather than filter
+        every earlier row.
+        """
+        seek, equal = Q(), {}
+        for key, value in zip(ordering, position):
+            field = key.lstrip('-')
+            lookup = 'lt' if key.startswith('-') else 'gt'
+            seek |= Q(**equal, **{f'{field}__{lookup}': value})
+            equal[field] = value
+
+        first = ordering[0]
+        lookup = 'lte' if first.startswith('-') else 'gte'
+        return Q(**{f'{first.lstrip("-")}__{lookup}': position[0]}) & seek
+
+    def position(self, obj):
+        return [
+            encode_value(getattr(obj, key.lstrip('-')))
+            for key in self.ordering
+        ]
+
+    def encode_cursor(self, position, reverse):
+        data = json.dumps({'p': position, 'r': reverse}, separators=(',', ':'))
+        cursor = urlsafe_b64encode(data.encode()).decode()
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.offset_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        cursor = request.query_params[self.cursor_query_param]
+        if not cursor:
+            return None, False
+
+        try:
+            data = json.loads(urlsafe_b64decode(cursor.encode()))
+            position, reverse = data['p'], bool(data['r'])
+
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or \
+                len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return position, reverse
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position, False)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, True)
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_html_context(self):
+        if not self.keyset:
+            return super().get_html_context()
+
+        return {
+            'previous_url': self.get_previous_link(),
+            'next_url': self.get_next_link(),
+        }
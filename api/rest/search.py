@@ -0,0 +1,55 @@
+import logging
+
+from django.db import transaction
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+from rest.extractors import get_extractor
+
+
+LOGGER = logging.getLogger(__name__)
+LOGGER.addHandler(logging.NullHandler())
+
+# Text fields search terms are extracted from, per model.
+SEARCH_FIELDS = {
+    'video': ('title', 'description'),
+    'channel': ('name', 'title', 'description', 'url'),
+}
+
+
+def dirty_key(model):
+    return f'search:dirty:{model._meta.model_name}'
+
+
+def mark_dirty(model, ids):
+    """
+    Queue objects for search term extraction. Deferred until the
+    transaction commits so the indexer never reads rows it can't see yet.
+    """
+    ids = list(ids)
+    if not ids:
+        return
+
+    def _mark():
+        try:
+            get_redis_connection('default').sadd(dirty_key(model), *ids)
+
+        except RedisError:
+            LOGGER.exception('Could not mark %i %s objects dirty', len(ids),
+                             model._meta.model_name)
+
+    transaction.on_commit(_mark)
+
+
+def pop_dirty(model, count):
+    ids = get_redis_connection('default').spop(dirty_key(model), count)
+    return [int(id) for id in ids]
+
+
+def restore_dirty(model, ids):
+    if ids:
+        get_redis_connection('default').sadd(dirty_key(model), *ids)
+
+
+def extract_each(texts):
+    return get_extractor().extract_each(texts)
@@ -113,8 +113,8 @@ class ChannelObjectSerializer(serializers.ModelSerializer):
             self.fields.pop(field_name)
 
     uid = serializers.CharField(read_only=True)
-    n_videos = serializers.IntegerField()
-    n_subscribers = serializers.IntegerField()
+    n_videos = serializers.IntegerField(read_only=True)
+    n_subscribers = serializers.IntegerField(read_only=True)
     rank = serializers.FloatField(read_only=True)
     snippet = serializers.CharField(read_only=True)
 
@@ -131,7 +131,7 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ('uid', 'name', 'n_tagged')
 
     uid = serializers.CharField(read_only=True)
-    n_tagged = serializers.IntegerField()
+    n_tagged = serializers.IntegerField(read_only=True)
 
 
 class TermSerializer(serializers.ModelSerializer):
@@ -170,9 +170,9 @@ class VideoObjectSerializer(serializers.ModelSerializer):
     is_played = serializers.SerializerMethodField()
     is_liked = serializers.SerializerMethodField()
     is_disliked = serializers.SerializerMethodField()
-    n_plays = serializers.IntegerField()
-    n_likes = serializers.IntegerField()
-    n_dislikes = serializers.IntegerField()
+    n_plays = serializers.IntegerField(read_only=True)
+    n_likes = serializers.IntegerField(read_only=True)
+    n_dislikes = serializers.IntegerField(read_only=True)
 
     def get_cursor(self, obj):
         return getattr(obj, 'cursor', None)
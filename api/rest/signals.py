@@ -1,56 +1,308 @@
 import logging
-from collections import Counter
 
-import spacy
+from collections import Counter
 
-from django.db.models.signals import post_save, m2m_changed, pre_delete
+from django.db.models.signals import (
+    pre_save, post_save, post_delete, m2m_changed, pre_delete,
+)
 from django.dispatch import receiver
-from django.db.models import Value
-from django.contrib.postgres.search import SearchVector
 
-from rest.models import Video, Channel, Tag, Term
+from rest.models import (
+    Video, Channel, Tag, Play, Like, Dislike, Subscription, post_bulk_upsert,
+    tags_changed,
+)
+from rest.search import mark_dirty
+from rest.entitlements import invalidate_users
+from rest.cache import invalidate as invalidate_listings, channel_tag
 
 
 LOGGER = logging.getLogger(__name__)
 LOGGER.addHandler(logging.NullHandler())
 
-NLP = spacy.load('en_core_web_sm')
-
-
-def extract_ngrams(instance, field_names):
-    for field_name in field_names:
-        text = getattr(instance, field_name)
-        if text is None:
-            continue
-        for ngram in NLP(text).noun_chunks:
-            yield ngram.text
+VIDEO_COUNTERS = {
+    Play: 'n_plays',
+    Like: 'n_likes',
+    Dislike: 'n_dislikes',
+}
+# Channel fields shown in listings, saves touching only others (crawl
+# bookkeeping) leave cached listings alone.
+LISTED_CHANNEL_FIELDS = {
+    'name', 'url', 'title', 'description', 'poster', 'is_public',
+}
 
 
 @receiver(pre_delete, sender=Tag)
 def tag_delete_search(sender, instance, **kwargs):
     # NOTE: deleting a Tag does not send m2m_changed, only using the m2m
-    # manager methods does. This code sends m2m_changed so we can update the
+    # manager methods does. This code sends tags_changed so we can update the
     # index. https://code.djangoproject.com/ticket/17688
-    LOGGER.debug('Dispatching m2m_changed for tag deletion')
-    for video in instance.tagged.all():
-        m2m_changed.send(
-            Video.tags.through, instance=video, action='pre_remove')
+    LOGGER.debug('Dispatching tags_changed for tag deletion')
+    tags_changed.send(Video, instances=list(instance.tagged.only('id')))
 
 
+# NOTE: terms are extracted in batches by rest.tasks.search, these only
+# queue the objects.
 @receiver(post_save, sender=Video)
 @receiver(m2m_changed, sender=Video.tags.through)
-def update_video_search(sender, instance, **kwargs):
-    LOGGER.debug('Updating search terms for video id: %i', instance.id)
-    ngrams = Counter(
-        extract_ngrams(instance, ('title', 'description'))
-    )
-    Term.objects.bulk_create(ngrams.items())
+def update_video_search(sender, instance, reverse=False, pk_set=None,
+                        **kwargs):
+    if reverse:
+        # NOTE: instance is a Tag, pk_set holds the videos.
+        mark_dirty(Video, pk_set or ())
+        return
+
+    LOGGER.debug('Queueing search terms for video id: %i', instance.id)
+    mark_dirty(Video, [instance.id])
+
+
+@receiver(post_bulk_upsert, sender=Video)
+@receiver(tags_changed, sender=Video)
+def update_videos_search(sender, instances, **kwargs):
+    LOGGER.debug('Queueing search terms for %i videos', len(instances))
+    mark_dirty(Video, [instance.id for instance in instances])
 
 
 @receiver(post_save, sender=Channel)
 def update_channel_search(sender, instance, created, **kwargs):
-    LOGGER.debug('Updating search terms for channel id: %i', instance.id)
-    ngrams = Counter(
-        extract_ngrams(instance, ('name', 'title', 'description', 'url'))
-    )
-    Term.objects.bulk_create(ngrams.items())
+    LOGGER.debug('Queueing search terms for channel id: %i', instance.id)
+    mark_dirty(Channel, [instance.id])
+
+
+@receiver(post_delete, sender=Video)
+@receiver(post_delete, sender=Channel)
+def delete_search(sender, instance, **kwargs):
+    # NOTE: the indexer finds the object gone and subtracts its terms.
+    LOGGER.debug('Queueing search terms for deleted %s id: %i',
+                 sender._meta.model_name, instance.id)
+    mark_dirty(sender, [instance.id])
+
+
+# NOTE: keep the stored counters in step, reconcile_counters repairs any
+# drift.
+@receiver(post_save, sender=Play)
+@receiver(post_save, sender=Like)
+@receiver(post_save, sender=Dislike)
+def count_video_engagement(sender, instance, created, **kwargs):
+    if created:
+        Video.objects.adjust_counters(
+            VIDEO_COUNTERS[sender], {instance.video_id: 1})
+
+
+@receiver(post_delete, sender=Play)
+@receiver(post_delete, sender=Like)
+@receiver(post_delete, sender=Dislike)
+def uncount_video_engagement(sender, instance, **kwargs):
+    Video.objects.adjust_counters(
+        VIDEO_COUNTERS[sender], {instance.video_id: -1})
+
+
+@receiver(post_save, sender=Video)
+def count_channel_video(sender, instance, created, **kwargs):
+    if created:
+        Channel.objects.adjust_counters(
+            'n_videos', {instance.channel_id: 1})
+
+
+@receiver(post_bulk_upsert, sender=Video)
+def count_channel_videos(sender, instances, created=(), **kwargs):
+    created = set(created)
+    deltas = Counter(
+        instance.channel_id for instance in instances
+        if instance.id in created)
+    Channel.objects.adjust_counters('n_videos', deltas)
+
+
+@receiver(pre_delete, sender=Video)
+def uncount_video_tags(sender, instance, **kwargs):
+    # NOTE: the cascade deletes the video's tag rows without m2m_changed.
+    tag_ids = instance.tags.values_list('id', flat=True)
+    Tag.objects.adjust_counters('n_tagged', {pk: -1 for pk in tag_ids})
+
+
+@receiver(post_delete, sender=Video)
+def uncount_channel_video(sender, instance, **kwargs):
+    Channel.objects.adjust_counters('n_videos', {instance.channel_id: -1})
+
+
+@receiver(m2m_changed, sender=Video.tags.through)
+def count_video_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    # NOTE: pk_set only tells which rows were requested, not which changed,
+    # so the affected counters are recounted rather than adjusted.
+    if action == 'pre_clear' and not reverse:
+        # NOTE: post_clear has no pk_set, remember the tags beforehand.
+        instance._cleared_tag_ids = list(
+            instance.tags.values_list('id', flat=True))
+
+    elif action == 'post_clear':
+        if reverse:
+            Tag.objects.recount_counters([instance.id])
+        else:
+            Tag.objects.recount_counters(instance._cleared_tag_ids)
+
+    elif action in ('post_add', 'post_remove'):
+        Tag.objects.recount_counters(
+            [instance.id] if reverse else pk_set or ())
+
+
+@receiver(post_save, sender=Subscription)
+def count_subscription(sender, instance, created, **kwargs):
+    if created:
+        Channel.objects.recount_counters(
+            instance.package.channels.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Subscription)
+def uncount_subscription(sender, instance, **kwargs):
+    Channel.objects.recount_counters(
+        Channel.objects
+        .filter(packages__id=instance.package_id)
+        .values_list('id', flat=True))
+
+
+@receiver(m2m_changed, sender=Channel.packages.through)
+def count_channel_packages(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            Channel.objects.recount_counters([instance.id])
+
+    # NOTE: instance is a Package, pk_set holds the channels.
+    elif action == 'pre_clear':
+        instance._cleared_channel_ids = list(
+            instance.channels.values_list('id', flat=True))
+
+    elif action == 'post_clear':
+        Channel.objects.recount_counters(instance._cleared_channel_ids)
+
+    elif action in ('post_add', 'post_remove'):
+        Channel.objects.recount_counters(pk_set or ())
+
+
+# NOTE: keep the cached entitlements of rest.entitlements precise, only
+# the users whose subscribed channels change are invalidated. Public
+# channels are not cached, so visibility changes need no invalidation.
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def subscription_entitlements_changed(sender, instance, **kwargs):
+    invalidate_users([instance.user_id])
+
+
+@receiver(m2m_changed, sender=Channel.packages.through)
+def package_entitlements_changed(sender, instance, action, reverse, pk_set,
+                                 **kwargs):
+    if action == 'pre_clear' and not reverse:
+        instance._cleared_package_ids = list(
+            instance.packages.values_list('id', flat=True))
+
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if reverse:
+        # NOTE: instance is a Package.
+        package_ids = [instance.id]
+    elif action == 'post_clear':
+        package_ids = instance._cleared_package_ids
+    else:
+        package_ids = pk_set or ()
+
+    invalidate_users(
+        Subscription.objects
+        .filter(package_id__in=package_ids)
+        .values_list('user_id', flat=True))
+
+
+# NOTE: retire the cached listings of rest.cache a change touches. Stored
+# counters are not followed, cached listings show them up to
+# LISTING_CACHE_TTL late.
+def video_listings(channel_ids, created=False):
+    tags = ['videos', 'tags', *map(channel_tag, set(channel_ids))]
+    if created:
+        # NOTE: n_videos of the channels.
+        tags.append('channels')
+    return tags
+
+
+@receiver(post_save, sender=Video)
+def video_saved_listings(sender, instance, created, **kwargs):
+    invalidate_listings(video_listings([instance.channel_id], created))
+
+
+@receiver(post_delete, sender=Video)
+def video_deleted_listings(sender, instance, **kwargs):
+    invalidate_listings(video_listings([instance.channel_id], True))
+
+
+@receiver(post_bulk_upsert, sender=Video)
+def videos_upserted_listings(sender, instances, created=(), **kwargs):
+    invalidate_listings(video_listings(
+        [instance.channel_id for instance in instances], bool(created)))
+
+
+@receiver(tags_changed, sender=Video)
+def video_tags_changed_listings(sender, instances, **kwargs):
+    invalidate_listings(video_listings(
+        [instance.channel_id for instance in instances]))
+
+
+@receiver(m2m_changed, sender=Video.tags.through)
+def video_tags_listings(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # NOTE: instance is a Tag, post_clear has no pk_set.
+        instance._cleared_channel_ids = list(
+            instance.tagged.values_list('channel_id', flat=True).distinct())
+
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        channel_ids = [instance.channel_id]
+    elif action == 'post_clear':
+        channel_ids = instance._cleared_channel_ids
+    else:
+        channel_ids = Video.objects \
+            .filter(id__in=pk_set or ()) \
+            .values_list('channel_id', flat=True)
+    invalidate_listings(video_listings(channel_ids))
+
+
+@receiver(post_delete, sender=Tag)
+def tag_deleted_listings(sender, instance, **kwargs):
+    invalidate_listings(['tags'])
+
+
+@receiver(pre_save, sender=Channel)
+def channel_visibility_changing(sender, instance, **kwargs):
+    # NOTE: noted here but acted on after the write, outside a transaction
+    # on_commit() runs at once and a reader could cache the old listing
+    # under the new version.
+    if instance._state.adding:
+        instance._visibility_changed = instance.is_public
+    else:
+        instance._visibility_changed = \
+            'is_public' in instance.get_dirty_fields()
+
+
+@receiver(post_save, sender=Channel)
+def channel_visibility_changed(sender, instance, **kwargs):
+    if getattr(instance, '_visibility_changed', False):
+        invalidate_listings(['public'])
+
+
+@receiver(pre_save, sender=Channel)
+def channel_listing_changing(sender, instance, **kwargs):
+    instance._listing_changed = instance._state.adding or bool(
+        LISTED_CHANNEL_FIELDS.intersection(instance.get_dirty_fields()))
+
+
+@receiver(post_save, sender=Channel)
+def channel_saved_listings(sender, instance, **kwargs):
+    if getattr(instance, '_listing_changed', False):
+        # NOTE: video listings embed their channel.
+        invalidate_listings(['channels', 'videos', channel_tag(instance.id)])
+
+
+@receiver(post_delete, sender=Channel)
+def channel_deleted_listings(sender, instance, **kwargs):
+    invalidate_listings([
+        'channels', 'videos', 'tags', channel_tag(instance.id),
+    ])
@@ -1,6 +1,16 @@
 from rest.tasks.video import (
-    update_channels, update_channel,
+    update_channels, update_channel, crawl_due_channels, prune_metadata,
+    prune_crawls,
+)
+from rest.tasks.counters import reconcile_counters
+from rest.tasks.search import (
+    index_search_terms, compact_terms, rebuild_search_terms,
 )
 
 
-__all__ = ['update_channels', 'update_channel']
+__all__ = [
+    'update_channels', 'update_channel', 'crawl_due_channels',
+    'prune_metadata', 'prune_crawls',
+    'index_search_terms', 'compact_terms', 'rebuild_search_terms',
+    'reconcile_counters',
+]
@@ -0,0 +1,30 @@
+from celery.utils.log import get_task_logger
+from django.conf import settings
+
+from api.celery import task
+from rest.models import Video, Channel, Tag
+
+
+LOGGER = get_task_logger(__name__)
+
+# Models with stored counters, see rest.models.CounterManagerMixin.
+COUNTED_MODELS = (Video, Channel, Tag)
+
+
+def reconcile_model(model, batch_size):
+    after, repaired = 0, 0
+    while True:
+        after, n_repaired = model.objects.reconcile_counters(
+            after=after, limit=batch_size)
+        if after is None:
+            return repaired
+        repaired += n_repaired
+
+
+@task
+def reconcile_counters(batch_size=None):
+    batch_size = batch_size or settings.COUNTER_RECONCILE_BATCH_SIZE
+    for model in COUNTED_MODELS:
+        repaired = reconcile_model(model, batch_size)
+        LOGGER.info('Reconciled %s counters, %i repaired',
+                    model._meta.model_name, repaired)
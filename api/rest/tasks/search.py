@@ -0,0 +1,76 @@
+from collections import Counter
+
+from celery.utils.log import get_task_logger
+from django.conf import settings
+from django.db import connection
+
+from api.celery import task
+from rest.models import Video, Channel, Term, TermSource
+from rest.search import (
+    SEARCH_FIELDS, mark_dirty, pop_dirty, restore_dirty, extract_each,
+)
+from rest.tasks.video import chunked
+
+
+LOGGER = get_task_logger(__name__)
+
+
+def index_batch(model, ids):
+    fields = SEARCH_FIELDS[model._meta.model_name]
+    # NOTE: deleted objects keep an empty Counter so their terms are
+    # subtracted.
+    ngrams = {id: Counter() for id in ids}
+    owners, texts = [], []
+    for row in model.objects.filter(id__in=ids).values_list('id', *fields):
+        for text in row[1:]:
+            if text:
+                owners.append(row[0])
+                texts.append(text)
+
+    for owner, text_ngrams in zip(owners, extract_each(texts)):
+        ngrams[owner].update(text_ngrams)
+
+    TermSource.objects.update_terms(model, ngrams)
+    return sum(len(counts) for counts in ngrams.values())
+
+
+@task
+def index_search_terms(batch_size=None):
+    batch_size = batch_size or settings.SEARCH_INDEX_BATCH_SIZE
+
+    for model in (Video, Channel):
+        while True:
+            ids = pop_dirty(model, batch_size)
+            if not ids:
+                break
+
+            try:
+                n_terms = index_batch(model, ids)
+
+            except Exception:
+                # NOTE: put them back for the next run.
+                restore_dirty(model, ids)
+                raise
+
+            LOGGER.info('Indexed %i terms from %i %s objects', n_terms,
+                        len(ids), model._meta.model_name)
+
+
+@task
+def compact_terms(min_freq=None):
+    deleted = Term.objects.compact(
+        min_freq or settings.SEARCH_TERM_MIN_FREQ)
+    LOGGER.info('Removed %i infrequent terms', deleted)
+
+
+@task
+def rebuild_search_terms():
+    # NOTE: starts the index over, for when Term has drifted from what
+    # TermSource says was added.
+    with connection.cursor() as c:
+        c.execute('TRUNCATE "rest_term", "rest_termsource"')
+
+    for model in (Video, Channel):
+        ids = model.objects.values_list('id', flat=True).iterator()
+        for chunk in chunked(ids, settings.SEARCH_INDEX_BATCH_SIZE):
+            mark_dirty(model, chunk)
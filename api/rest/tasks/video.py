@@ -4,85 +4,375 @@ import logging
 import time
 import random
 
+from copy import deepcopy
 from pprint import pprint, pformat
-from itertools import repeat
+from itertools import repeat, islice
+from collections import defaultdict
 
-from celery import chain
+from celery import chain, group
 from celery.utils.log import get_task_logger
 from django.conf import settings
-from django.db import IntegrityError, DatabaseError
+from django.db import IntegrityError, DatabaseError, connection
+from django.db.models import F, Min, Max
+from django.utils import timezone
 from videosrc import crawl_sync
 
 from api.celery import task
+from rest.backfill import backfill_channel
+from rest.breaker import CircuitBreaker, backoff, is_channel_error
+from rest.locks import Lease
 from rest.models import (
     Subscription, Channel, ChannelMeta, Video, VideoMeta, VideoSource,
-    VideoSourceMeta,
+    VideoSourceMeta, MetadataBlob, Crawl,
 )
 
 
 LOGGER = get_task_logger(__name__)
 
 
-def save_state_factory(channel):
-    def save_state(state):
-        LOGGER.info('Saving state for channel %s', channel.name)
-        channel.update(state=state)
-    return save_state
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def plan_crawl_lanes(channels, concurrency, host_concurrency):
+    """
+    Split channels (in crawl priority order) into at most concurrency lanes.
+    Each lane is crawled serially, and a host never spans more than
+    host_concurrency lanes, so neither limit can be exceeded.
+    """
+    # NOTE: a limit below one would leave channels out of every lane.
+    concurrency, host_concurrency = \
+        max(concurrency, 1), max(host_concurrency, 1)
+    channels = list(channels)
+    rank = {channel.id: i for i, channel in enumerate(channels)}
+
+    by_host = defaultdict(list)
+    for channel in channels:
+        by_host[channel.host].append(channel)
+
+    host_lanes = []
+    for host_channels in by_host.values():
+        n_lanes = min(host_concurrency, len(host_channels))
+        for i in range(n_lanes):
+            host_lanes.append(host_channels[i::n_lanes])
+
+    # NOTE: longest first onto the shortest lane keeps lanes balanced.
+    lanes = [[] for _ in range(min(concurrency, len(host_lanes)))]
+    for host_lane in sorted(host_lanes, key=len, reverse=True):
+        min(lanes, key=len).extend(host_lane)
+
+    return [
+        sorted(lane, key=lambda channel: rank[channel.id]) for lane in lanes
+    ]
+
+
+def dispatch_crawls(channels):
+    # NOTE: each lane is a chain so it's updates run one after the other,
+    # lanes run in parallel. update_channel never fails for good, as that
+    # would break the chain.
+    lanes = plan_crawl_lanes(
+        channels, settings.CRAWL_CONCURRENCY, settings.CRAWL_HOST_CONCURRENCY)
+
+    tasks = []
+    for lane in lanes:
+        for channel in lane:
+            LOGGER.debug('Scheduling channel update for %s', channel.name)
+        tasks.append(chain(update_channel.si(channel.id) for channel in lane))
+    group(tasks).delay()
+
+
+class StateCheckpointer:
+    """
+    save_state callback for crawl_sync that coalesces state updates. State
+    is written at most every interval seconds or every pages updates, and
+    whenever flush() is called, which the crawl does on completion and on
+    error so resuming stays correct.
+    """
+    def __init__(self, channel, lease=None, interval=None, pages=None):
+        self.channel = channel
+        self.lease = lease
+        self.interval = interval or settings.CRAWL_CHECKPOINT_INTERVAL
+        self.pages = pages or settings.CRAWL_CHECKPOINT_PAGES
+        self.state = None
+        self.pending = 0
+        self.written = 0
+        self.skipped = 0
+        self.flushed_at = time.monotonic()
+
+    def __call__(self, state):
+        # NOTE: the crawler may keep mutating its state, keep the state as
+        # it was reported.
+        self.state = deepcopy(state)
+        self.pending += 1
+        if self.pending >= self.pages or \
+           time.monotonic() - self.flushed_at >= self.interval:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+
+        LOGGER.info('Saving state for channel %s', self.channel.name)
+        self.channel.update(state=self.state)
+        self.written += 1
+        self.skipped += self.pending - 1
+        self.pending = 0
+        self.flushed_at = time.monotonic()
+        if self.lease:
+            self.lease.renew()
+
+
+class CrawlRecorder:
+    """
+    Collects telemetry for one crawl and saves it as a Crawl. Install as a
+    database execute wrapper to count queries, fetch() and iterate() time
+    the calls into the video host.
+    """
+    def __init__(self, channel, retries=0, backfill=False):
+        self.channel = channel
+        self.retries = retries
+        self.backfill = backfill
+        self.status = 'ok'
+        self.started = timezone.now()
+        self.start = time.monotonic()
+        self.fetch_time = 0.0
+        self.queries = 0
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    def fetch(self, func, *args, **kwargs):
+        start = time.monotonic()
+        try:
+            return func(*args, **kwargs)
+
+        finally:
+            self.fetch_time += time.monotonic() - start
+
+    def iterate(self, iterable):
+        iterator = iter(iterable)
+        while True:
+            start = time.monotonic()
+            try:
+                item = next(iterator)
+
+            except StopIteration:
+                return
+
+            finally:
+                self.fetch_time += time.monotonic() - start
+
+            yield item
+
+    def count(self, created=0, updated=0, unchanged=0):
+        self.created += created
+        self.updated += updated
+        self.unchanged += unchanged
+
+    def save(self):
+        wall_time = time.monotonic() - self.start
+        return Crawl.objects.create(
+            channel=self.channel,
+            started=self.started,
+            status=self.status,
+            backfill=self.backfill,
+            wall_time=wall_time,
+            fetch_time=self.fetch_time,
+            db_time=max(wall_time - self.fetch_time, 0),
+            videos_created=self.created,
+            videos_updated=self.updated,
+            videos_unchanged=self.unchanged,
+            queries=self.queries,
+            retries=self.retries,
+        )
 
 
 @task(bind=True, max_retries=3)
 def update_channel(self, channel_id):
-    try:
-        channel = Channel.objects.get(pk=channel_id)
-    except Channel.DoesNotExist:
-        LOGGER.warning('Invalid channel id %i', channel_id)
-        return
+    # NOTE: the lease keeps a beat tick, random update or retry from crawling
+    # a channel that is already being crawled.
+    with Lease('channel', channel_id) as lease:
+        if not lease.acquired:
+            LOGGER.info('Channel %i is already being crawled, skipping',
+                        channel_id)
+            return 'skipped'
+
+        try:
+            channel = Channel.objects.defer(None).get(pk=channel_id)
+        except Channel.DoesNotExist:
+            LOGGER.warning('Invalid channel id %i', channel_id)
+            return
+
+        breaker = CircuitBreaker(channel.host)
+        if not breaker.allow():
+            LOGGER.info('Circuit open for host %s, skipping channel %s',
+                        channel.host, channel.name)
+            return 'short-circuited'
+
+        crawl_channel(self, channel, lease, breaker)
+
 
+def crawl_channel(task, channel, lease, breaker):
+    checkpoint = StateCheckpointer(channel, lease)
+    # NOTE: channels crawled before crawled was recorded have it NULL too,
+    # only a channel without videos is backfilled.
+    backfill = settings.CRAWL_BACKFILL and not channel.videos.exists()
+    recorder = CrawlRecorder(
+        channel, retries=task.request.retries or 0, backfill=backfill)
     try:
-        auth_params = channel.auth_params or {}
-        channel_data, videos = crawl_sync(
-            channel.url,
-            state=channel.state,
-            save_state=save_state_factory(channel),
-            **auth_params,
-        )
-        channel.from_dataclass(channel_data)
+        with connection.execute_wrapper(recorder):
+            crawl_videos(channel, checkpoint, lease, recorder)
+
+        channel.schedule_crawl(crawled=timezone.now())
+        breaker.success()
 
+    except DatabaseError:
+        recorder.status = 'failed'
+        LOGGER.exception('Error saving video data')
+    
+    except Exception as e:
+        LOGGER.exception('Error fetching video data')
+        retries = task.request.retries or 0
+        if is_channel_error(e):
+            # NOTE: the host answered, so it is up, and retrying would fail
+            # the same way.
+            breaker.success()
+            recorder.status = 'failed'
+            return
+
+        if breaker.failure(channel.id):
+            # NOTE: the host is down, retrying would only hold a worker.
+            recorder.status = 'failed'
+            return
+
+        if retries >= task.max_retries:
+            # NOTE: give up without raising, a failed task would end its
+            # lane's chain and the rest of the lane would not be crawled.
+            recorder.status = 'failed'
+            return
+
+        recorder.status = 'retry'
+        task.retry(exc=e, countdown=backoff(retries))
+
+    finally:
+        try:
+            checkpoint.flush()
+
+        except (DatabaseError, TypeError):
+            LOGGER.exception('Error saving state for channel %s', channel.name)
+
+        LOGGER.info('State checkpoints for channel %s, %i written, %i skipped',
+                    channel.name, checkpoint.written, checkpoint.skipped)
+
+        try:
+            recorder.save()
+
+        except DatabaseError:
+            LOGGER.exception('Error saving crawl stats for channel %s',
+                             channel.name)
+
+
+def crawl_videos(channel, checkpoint, lease, recorder):
+    auth_params = channel.auth_params or {}
+    channel_data, videos = recorder.fetch(
+        crawl_sync,
+        channel.url,
+        state=channel.state,
+        save_state=checkpoint,
+        **auth_params,
+    )
+    channel.from_dataclass(channel_data)
+    videos = recorder.iterate(videos)
+
+    batch_size = settings.CRAWL_BATCH_SIZE
+    if recorder.backfill:
+        # NOTE: a new channel can have tens of thousands of videos.
+        created, updated, unchanged = backfill_channel(
+            channel, videos, progress=lease.renew)
+        recorder.count(len(created), len(updated), unchanged)
+        LOGGER.info(
+            'Backfilled channel %s, %i added, %i updated, %i unchanged',
+            channel.name, len(created), len(updated), unchanged)
+
+    elif batch_size:
+        for batch in chunked(videos, batch_size):
+            created, updated, unchanged = \
+                Video.objects.bulk_from_dataclass(channel, batch)
+            recorder.count(len(created), len(updated), len(unchanged))
+            for video_id in created:
+                LOGGER.debug('Added new video %s', video_id)
+            for video_id in updated:
+                LOGGER.info('Updated video %s', video_id)
+            LOGGER.info(
+                'Saved %i videos for channel %s, %i added, %i updated, '
+                '%i unchanged', len(batch), channel.name, len(created),
+                len(updated), len(unchanged))
+            lease.renew()
+
+    else:
         for video in videos:
             video, created = Video.objects.from_dataclass(channel, video)
             if created:
+                recorder.count(created=1)
                 LOGGER.debug('Added new video %s', video.id)
 
+            elif created is None:
+                recorder.count(unchanged=1)
+                LOGGER.debug('Unchanged video %s', video.id)
+
             else:
+                recorder.count(updated=1)
                 LOGGER.info('Updated video %s', video.id)
 
-    except DatabaseError:
-        LOGGER.exception('Error saving video data')
-    
-    except Exception as e:
-        LOGGER.exception('Error fetching video data')
-        self.retry(exc=e)
+            # NOTE: one round trip to Redis, cheap next to the writes.
+            lease.renew()
 
 
 @task
 def update_channels():
-    # NOTE: we use a chain so updates run one after the other.
-    tasks = chain()
-    for channel in Channel.objects.all():
-        LOGGER.debug('Scheduling channel update for %s', channel.name)
-        tasks |= update_channel.si(channel.id)
-    tasks.delay()
+    # NOTE: least recently crawled channels go first.
+    channels = Channel.objects \
+        .only('id', 'name', 'url') \
+        .order_by(F('crawled').asc(nulls_first=True), 'id')
+    dispatch_crawls(channels)
+
+
+@task
+def crawl_due_channels(limit=None):
+    # NOTE: runs on every beat tick, replaces a PeriodicTask per channel.
+    ids = Channel.objects.claim_due(limit or settings.CRAWL_DUE_LIMIT)
+    if not ids:
+        return
+
+    channels = Channel.objects \
+        .only('id', 'name', 'url') \
+        .filter(id__in=ids) \
+        .order_by(F('crawled').asc(nulls_first=True), 'id')
+    dispatch_crawls(channels)
 
 
 @task(bind=True, max_retries=3)
 def update_channels_random(self, n_channels=2):
-    indexes = set()
-
     try:
-        count = Channel.objects.all().count()
-        if count:
-            random_index = random.randint(0, count - 1 - n_channels)
-            for channel in Channel.objects.all()[random_index:random_index + n_channels]:
+        # NOTE: seek from a random id rather than OFFSET, which scans every
+        # row it skips.
+        bounds = Channel.objects.aggregate(Min('id'), Max('id'))
+        if bounds['id__min'] is not None:
+            random_id = random.randint(bounds['id__min'], bounds['id__max'])
+            channels = Channel.objects \
+                .only('id') \
+                .filter(id__gte=random_id) \
+                .order_by('id')[:n_channels]
+            for channel in channels:
                 update_channel.delay(channel.id)
 
     except Exception as e:
@@ -90,6 +380,19 @@ def update_channels_random(self, n_channels=2):
         self.retry(exc=e)
 
 
+@task
+def prune_metadata():
+    deleted = MetadataBlob.objects.prune()
+    LOGGER.info('Removed %i unreferenced metadata blobs', deleted)
+
+
+@task
+def prune_crawls():
+    before = timezone.now() - settings.CRAWL_STATS_RETENTION
+    deleted, _ = Crawl.objects.filter(started__lt=before).delete()
+    LOGGER.info('Removed %i crawl stats older than %s', deleted, before)
+
+
 @task
 def update_channels_():
     pass
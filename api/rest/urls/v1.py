@@ -3,9 +3,10 @@ from django.urls import path
 from rest_framework import routers
 
 from rest.views import (
-    theme_js, theme_css, favicon, UserViewSet, ChannelViewSet, TagViewSet,
-    VideoViewSet, OAuth2TokenViewSet, OAuthAuthCodeView, OAuthTokenView,
-    OAuthDeviceCodeView, OAuthDeviceCodeVerifyView, SearchView,
+    theme_js, theme_css, favicon, metrics, UserViewSet, ChannelViewSet,
+    TagViewSet, VideoViewSet, OAuth2TokenViewSet, OAuthAuthCodeView,
+    OAuthTokenView, OAuthDeviceCodeView, OAuthDeviceCodeVerifyView,
+    SearchView,
 )
 
 
@@ -20,6 +21,7 @@ urlpatterns = [
     path('brand/theme.css', theme_css),
     path('brand/theme.js', theme_js),
     path('brand/favicon.ico', favicon),
+    path('metrics/', metrics, name='metrics'),
     path(
         'oauth2/device/verify/',
         OAuthDeviceCodeVerifyView.as_view(),
@@ -49,6 +49,11 @@ from rest.filters import (
     TagFilterSet,
 )
 from rest.oauth import SERVER
+from rest.pagination import HybridPagination
+from rest.cache import cache_listing
+from rest.metrics import (
+    render_metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE,
+)
 
 
 User = get_user_model()
@@ -64,6 +69,20 @@ def favicon(request):
     return redirect(brand.favicon.url)
 
 
+def metrics(request):
+    # NOTE: scraped by Prometheus, which sends a bearer token rather than a
+    # session.
+    token = settings.METRICS_TOKEN
+    if not token:
+        raise Http404()
+
+    authorization = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(authorization, f'Bearer {token}'):
+        return HttpResponse(status=status.HTTP_401_UNAUTHORIZED)
+
+    return HttpResponse(render_metrics(), content_type=METRICS_CONTENT_TYPE)
+
+
 def theme_css(request):
     try:
         brand = SiteOption.objects.get(site=request.site).brand
@@ -99,12 +118,31 @@ def theme_js(request):
     )
 
 
-class UserViewSet(ModelViewSet):
+class PersonalizeVideosMixin:
+    """
+    Fills in the requesting user's fields on videos after pagination, with
+    one query per page, so the listing query is the same for every user.
+    """
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None and queryset.model is Video:
+            Video.objects.personalize(page, self.request.user)
+        return page
+
+    def get_object(self):
+        obj = super().get_object()
+        if isinstance(obj, Video):
+            Video.objects.personalize([obj], self.request.user)
+        return obj
+
+
+class UserViewSet(PersonalizeVideosMixin, ModelViewSet):
     permission_classes = [CreateOrIsAuthenticatedOrReadOnly]
     serializer_class = UserSerializer
     queryset = User.objects.all()
     lookup_field = 'uid'
     filterset_class = UserFilterSet
+    pagination_class = HybridPagination
 
     def perform_create(self, serializer):
         user = serializer.save()
@@ -178,9 +216,11 @@ class UserViewSet(ModelViewSet):
             .select_related('channel') \
             .prefetch_related('sources')
 
+        # NOTE: annotated so keyset pagination can read the key back.
         queryset = queryset \
             .filter(plays__user=user) \
-            .order_by('-plays__created')
+            .annotate(played=F('plays__created')) \
+            .order_by('-played')
 
         page = self.paginate_queryset(queryset)
         if page is not None:
@@ -209,16 +249,23 @@ class UserViewSet(ModelViewSet):
         return response(serializer.data)
 
 
-class ChannelViewSet(ModelViewSet):
+class ChannelViewSet(PersonalizeVideosMixin, ModelViewSet):
     permission_classes = [AllowAny]
     serializer_class = ChannelSerializer
     lookup_field = 'uid'
     filterset_class = ChannelFilterSet
+    pagination_class = HybridPagination
+    keyset_ordering = ('name', 'id')
 
     def get_queryset(self):
         return Channel.objects.for_user(self.request.user, annotated=True)
 
+    @cache_listing('public', 'channels')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
     @action(detail=True)
+    @cache_listing('public', 'channel:{uid}')
     def videos(self, request, uid):
         queryset = self.get_queryset()
 
@@ -230,7 +277,8 @@ class ChannelViewSet(ModelViewSet):
 
         videos = Video.objects \
             .filter(channel=channel) \
-            .default_annotations(user=request.user)
+            .default_annotations() \
+            .order_by('-published', '-id')
 
         page = self.paginate_queryset(videos)
         if page is not None:
@@ -250,17 +298,27 @@ class TagViewSet(ModelViewSet):
     def get_queryset(self):
         return Tag.objects.default_annotations()
 
+    @cache_listing('tags')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
-class VideoViewSet(ModelViewSet):
+
+class VideoViewSet(PersonalizeVideosMixin, ModelViewSet):
     permission_classes = [AllowAny]
     serializer_class = VideoSerializer
     lookup_field = 'uid'
     filterset_class = VideoFilterSet
+    pagination_class = HybridPagination
+    keyset_ordering = ('-published', '-id')
 
     def get_queryset(self):
         return Video.objects.for_user(
             self.request.user, annotated=True, pre_fetch=True)
 
+    @cache_listing('public', 'videos')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
     @action(detail=True)
     def sources(self, request, uid):
         queryset = self.get_queryset()
@@ -397,9 +455,16 @@ class SearchView(APIView):
             'channels': Channel.objects.none(),
         }
         if search_videos:
-            search_results['videos'] = Video.objects \
-                .for_user(request.user, annotated=True) \
-                .search(keywords=keywords)
+            # NOTE: paged like the listings (limit and offset in the query
+            # string), so only the page served is personalized.
+            paginator = HybridPagination()
+            limit = paginator.get_limit(request)
+            offset = paginator.get_offset(request)
+            search_results['videos'] = Video.objects.personalize(list(
+                Video.objects
+                .for_user(request.user, annotated=True)
+                .search(keywords=keywords)[offset:offset + limit]
+            ), request.user)
 
         if search_channels:
             search_results['channels'] = Channel.objects \
@@ -0,0 +1,57 @@
+"""
+Stand-ins for the videosrc dataclasses, shared by the tests and the
+benchmarks.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, List, Optional
+
+
+# NOTE: mirror the videosrc dataclasses, the models only ever see asdict().
+@dataclass
+class VideoSourceData:
+    extern_id: str
+    url: str
+    width: Optional[int] = None
+    height: Optional[int] = None
+    fps: Optional[int] = None
+    size: Optional[int] = None
+    mime: Optional[str] = None
+    original: Any = None
+
+
+@dataclass
+class VideoData:
+    extern_id: str
+    title: str
+    description: Optional[str]
+    poster: str
+    duration: int
+    published: datetime
+    tags: List[str] = field(default_factory=list)
+    sources: List[VideoSourceData] = field(default_factory=list)
+    original: Any = None
+
+
+@dataclass
+class ChannelData:
+    extern_id: str
+    name: str = None
+    title: str = None
+    description: str = None
+    original: Any = None
+
+
+def video_data(i, tags=('cats', 'dogs'), title=None):
+    return VideoData(
+        extern_id=f'video-{i}', title=title or f'Video {i}',
+        description=None, poster=f'https://example.com/{i}.jpg',
+        duration=60, published=datetime(2023, 1, 1 + i), tags=list(tags),
+        sources=[
+            VideoSourceData(
+                extern_id=f'video-{i}-{width}',
+                url=f'https://example.com/{i}-{width}.mp4', width=width,
+                original={'width': width})
+            for width in (640, 1280)
+        ],
+        original={'id': i})
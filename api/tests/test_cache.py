@@ -0,0 +1,39 @@
+from unittest import mock
+
+from django.contrib.sites.models import Site
+from django.test import SimpleTestCase
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from rest.cache import listing_key, should_refresh
+
+
+class ListingCacheTestCase(SimpleTestCase):
+    def request(self, path, query, renderer=JSONRenderer):
+        request = Request(APIRequestFactory().get(f'{path}?{query}'))
+        request.site = Site(id=1)
+        request.accepted_renderer = renderer()
+        return request
+
+    def test_key(self):
+        self.assertEqual(
+            listing_key(self.request('/videos/', 'limit=10&order=-n_plays')),
+            listing_key(self.request('/videos/', 'order=-n_plays&limit=10')))
+        self.assertNotEqual(
+            listing_key(self.request('/videos/', 'limit=10')),
+            listing_key(self.request('/videos/', 'limit=20')))
+        self.assertNotEqual(
+            listing_key(self.request('/videos/', 'limit=10')),
+            listing_key(self.request('/tags/', 'limit=10')))
+        self.assertNotEqual(
+            listing_key(self.request('/videos/', 'limit=10')),
+            listing_key(self.request(
+                '/videos/', 'limit=10', renderer=BrowsableAPIRenderer)))
+
+    def test_should_refresh(self):
+        entry = {'expires': 100.0, 'delta': 1.0}
+        with mock.patch('rest.cache.random.random', return_value=0.5):
+            self.assertFalse(should_refresh(entry, 90.0))
+            self.assertTrue(should_refresh(entry, 99.5))
+            self.assertTrue(should_refresh(entry, 101.0))
@@ -0,0 +1,176 @@
+import threading
+import time
+
+from collections import Counter
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+
+from rest.models import (
+    User, Channel, Video, Tag, Play, Like, Dislike, Package, Subscription,
+    Term, TermSource,
+)
+from rest.tasks.counters import reconcile_model
+from tests.fixtures import video_data
+
+
+class CountersTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(
+            username='user', email='user@example.com', site_id=1)
+        self.channel = Channel.objects.create(
+            user=self.user, extern_id='channel', name='channel',
+            url='https://example.com/channel')
+
+    def counts(self, obj, *fields):
+        obj.refresh_from_db(fields=fields)
+        return tuple(getattr(obj, field) for field in fields)
+
+    def n_tagged(self, *names):
+        return tuple(Tag.objects.get(name=name).n_tagged for name in names)
+
+    def test_engagement(self):
+        video, _ = Video.objects.from_dataclass(self.channel, video_data(1))
+        Play.objects.create(user=self.user, video=video)
+        Play.objects.create(user=self.user, video=video)
+        Like.objects.create(user=self.user, video=video)
+        self.assertEqual(
+            self.counts(video, 'n_plays', 'n_likes', 'n_dislikes'),
+            (2, 1, 0))
+
+        # NOTE: a dislike deletes the like and vice versa.
+        Dislike.objects.create(user=self.user, video=video)
+        self.assertEqual(
+            self.counts(video, 'n_likes', 'n_dislikes'), (0, 1))
+        Like.objects.create(user=self.user, video=video)
+        self.assertEqual(
+            self.counts(video, 'n_likes', 'n_dislikes'), (1, 0))
+
+        Play.objects.filter(video=video).delete()
+        self.assertEqual(self.counts(video, 'n_plays'), (0,))
+
+    def test_bulk_upsert(self):
+        Video.objects.bulk_from_dataclass(
+            self.channel, [video_data(i) for i in range(3)])
+        self.assertEqual(self.counts(self.channel, 'n_videos'), (3,))
+
+        # NOTE: only the videos created count, not the ones updated.
+        Video.objects.bulk_from_dataclass(
+            self.channel, [video_data(i, tags=('cats',)) for i in range(5)])
+        self.assertEqual(self.counts(self.channel, 'n_videos'), (5,))
+        self.assertEqual(self.n_tagged('cats', 'dogs'), (5, 0))
+
+    def test_tags_clear(self):
+        video, _ = Video.objects.from_dataclass(self.channel, video_data(1))
+        other, _ = Video.objects.from_dataclass(self.channel, video_data(2))
+        self.assertEqual(self.n_tagged('cats', 'dogs'), (2, 2))
+
+        video.tags.clear()
+        self.assertEqual(self.n_tagged('cats', 'dogs'), (1, 1))
+
+        Tag.objects.get(name='cats').tagged.clear()
+        self.assertEqual(self.n_tagged('cats', 'dogs'), (0, 1))
+
+    def test_cascade(self):
+        Video.objects.bulk_from_dataclass(
+            self.channel, [video_data(i) for i in range(3)])
+        video = Video.objects.get(extern_id='video-0')
+        Like.objects.create(user=self.user, video=video)
+
+        video.delete()
+        self.assertEqual(self.counts(self.channel, 'n_videos'), (2,))
+        self.assertEqual(self.n_tagged('cats', 'dogs'), (2, 2))
+
+        self.channel.delete()
+        self.assertEqual(self.n_tagged('cats', 'dogs'), (0, 0))
+
+    def test_subscribers(self):
+        package = Package.objects.create(user=self.user, name='package')
+        self.channel.packages.add(package)
+        Subscription.objects.create(user=self.user, package=package)
+        self.assertEqual(self.counts(self.channel, 'n_subscribers'), (1,))
+
+        package.channels.clear()
+        self.assertEqual(self.counts(self.channel, 'n_subscribers'), (0,))
+
+    def test_reconcile(self):
+        Video.objects.bulk_from_dataclass(
+            self.channel, [video_data(i) for i in range(3)])
+        videos = list(Video.objects.order_by('id'))
+        Play.objects.create(user=self.user, video=videos[0])
+        Video.objects.update(n_plays=5)
+        Channel.objects.update(n_videos=0)
+        with connection.cursor() as c:
+            c.execute(
+                'UPDATE "rest_tag" SET "n_tagged" = 9 WHERE "name" = %s',
+                ['cats'])
+
+        self.assertEqual(
+            Video.objects.reconcile_counters(after=0, limit=2),
+            (videos[1].id, 2))
+        self.assertEqual(self.counts(videos[2], 'n_plays'), (5,))
+        self.assertEqual(
+            Video.objects.reconcile_counters(after=videos[1].id, limit=2),
+            (videos[2].id, 1))
+        self.assertEqual(
+            Video.objects.reconcile_counters(after=videos[2].id, limit=2),
+            (None, 0))
+        self.assertEqual(
+            [self.counts(video, 'n_plays') for video in videos],
+            [(1,), (0,), (0,)])
+
+        self.assertEqual(reconcile_model(Channel, 1), 1)
+        call_command(
+            'reconcile_counters', '--batch-size', '1', stdout=StringIO())
+        self.assertEqual(self.counts(self.channel, 'n_videos'), (3,))
+        self.assertEqual(self.n_tagged('cats', 'dogs'), (3, 3))
+
+
+class TermSourceTestCase(TransactionTestCase):
+    def update_terms(self, ngrams, started):
+        try:
+            with connection.cursor() as c:
+                c.execute('SELECT pg_backend_pid()')
+                self.worker_pid = c.fetchone()[0]
+            started.set()
+            TermSource.objects.update_terms(Video, ngrams)
+
+        finally:
+            connection.close()
+
+    def wait_for_lock(self, pid, timeout=10):
+        deadline = time.monotonic() + timeout
+        with connection.cursor() as c:
+            while time.monotonic() < deadline:
+                c.execute(
+                    'SELECT EXISTS(SELECT 1 FROM pg_locks '
+                    'WHERE "pid" = %s AND NOT "granted")', [pid])
+                if c.fetchone()[0]:
+                    return
+                time.sleep(0.01)
+        self.fail('Worker never waited for a lock')
+
+    def test_concurrent_new_object(self):
+        # NOTE: the second update waits for the first to commit, then only
+        # applies the difference, instead of adding its counts on top.
+        started = threading.Event()
+        with transaction.atomic():
+            TermSource.objects.update_terms(Video, {1: Counter(cats=1)})
+            thread = threading.Thread(
+                target=self.update_terms,
+                args=({1: Counter(cats=2)}, started))
+            thread.start()
+            self.assertTrue(started.wait(10))
+            self.wait_for_lock(self.worker_pid)
+        thread.join()
+
+        self.assertEqual(Term.objects.get(ngram='cats').freq, 2)
+        self.assertEqual(
+            TermSource.objects.get(model='video', object_id=1).ngrams,
+            {'cats': 2})
+
+        TermSource.objects.update_terms(Video, {1: Counter(), 2: Counter()})
+        self.assertEqual(Term.objects.get(ngram='cats').freq, 0)
+        self.assertFalse(TermSource.objects.exists())
@@ -0,0 +1,224 @@
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+from rest.models import (
+    Channel, get_crawl_interval, pack_state, unpack_state, STATE_VERSION,
+)
+from rest.breaker import CircuitBreaker, backoff, is_channel_error
+from rest.tasks.video import plan_crawl_lanes, StateCheckpointer
+
+
+URLS = [
+    'https://rumble.com/c/ATimcastIRL',
+    'https://www.rumble.com/c/Styxhexenhammer666',
+    'https://odysee.com/@AlphaNerd:8',
+    'https://rumble.com/c/TimcastNews',
+    'https://timcast.com/channel/culture-war/',
+    'https://rumble.com/c/DailyWire',
+    'https://odysee.com/@Lunduke:e',
+]
+
+
+class PlanCrawlLanesTestCase(SimpleTestCase):
+    def setUp(self):
+        self.channels = [
+            Channel(id=i, url=url) for i, url in enumerate(URLS)
+        ]
+
+    def test_host(self):
+        self.assertEqual(self.channels[1].host, 'rumble.com')
+
+    def test_limits(self):
+        lanes = plan_crawl_lanes(self.channels, 3, 2)
+        self.assertLessEqual(len(lanes), 3)
+        self.assertCountEqual(
+            [c.id for lane in lanes for c in lane],
+            [c.id for c in self.channels])
+        # A host is never spread over more lanes than allowed.
+        hosts = Counter(
+            host for lane in lanes for host in {c.host for c in lane})
+        self.assertLessEqual(max(hosts.values()), 2)
+
+    def test_order(self):
+        for lane in plan_crawl_lanes(self.channels, 2, 1):
+            ids = [c.id for c in lane]
+            self.assertEqual(ids, sorted(ids))
+
+    def test_zero_concurrency(self):
+        lanes = plan_crawl_lanes(self.channels, 0, 0)
+        self.assertEqual(len(lanes), 1)
+        self.assertEqual(len(lanes[0]), len(self.channels))
+
+
+class CrawlIntervalTestCase(SimpleTestCase):
+    def setUp(self):
+        self.now = datetime(2023, 6, 1, tzinfo=timezone.utc)
+
+    def test_empty(self):
+        self.assertEqual(get_crawl_interval([]), settings.CRAWL_INTERVAL_MAX)
+
+    def test_busy(self):
+        published = [self.now - timedelta(minutes=i) for i in range(10)]
+        self.assertEqual(
+            get_crawl_interval(published, self.now),
+            settings.CRAWL_INTERVAL_MIN)
+
+    def test_cadence(self):
+        published = [self.now - timedelta(hours=4 * i) for i in range(10)]
+        self.assertEqual(
+            get_crawl_interval(published, self.now), timedelta(hours=2))
+
+
+class StateCheckpointerTestCase(SimpleTestCase):
+    def setUp(self):
+        self.saved = []
+        self.channel = Channel(id=1, name='test')
+        self.channel.update = lambda state: self.saved.append(state)
+
+    def test_pages(self):
+        checkpoint = StateCheckpointer(self.channel, interval=3600, pages=3)
+        for page in range(7):
+            checkpoint({'page': page})
+        self.assertEqual(self.saved, [{'page': 2}, {'page': 5}])
+        checkpoint.flush()
+        self.assertEqual(self.saved[-1], {'page': 6})
+        self.assertEqual((checkpoint.written, checkpoint.skipped), (3, 4))
+
+    def test_interval(self):
+        checkpoint = StateCheckpointer(self.channel, interval=-1, pages=100)
+        checkpoint({'page': 0})
+        checkpoint({'page': 1})
+        self.assertEqual(len(self.saved), 2)
+
+    def test_snapshot(self):
+        checkpoint = StateCheckpointer(self.channel, interval=3600, pages=100)
+        state = {'page': 0}
+        checkpoint(state)
+        state['page'] = 1
+        checkpoint.flush()
+        checkpoint.flush()
+        self.assertEqual(self.saved, [{'page': 0}])
+
+
+class StateFormatTestCase(SimpleTestCase):
+    def test_roundtrip(self):
+        state = {
+            'page': 3,
+            'cursor': 'abc',
+            'seen': {1, 2},
+            'since': datetime(2023, 1, 1, tzinfo=timezone.utc),
+            'nested': {'ids': [1, 2, 3], 'done': None},
+        }
+        packed = pack_state(state)
+        self.assertEqual(packed[0], STATE_VERSION)
+        self.assertEqual(unpack_state(packed), state)
+
+    def test_unknown_version(self):
+        with self.assertRaises(ValueError):
+            unpack_state(bytes([STATE_VERSION + 1]) + pack_state({})[1:])
+
+    def test_unpackable(self):
+        with self.assertRaises(TypeError):
+            pack_state({'channel': Channel()})
+
+    def test_form_roundtrip(self):
+        state = {
+            'seen': {1, 2},
+            'since': datetime(2023, 1, 1, tzinfo=timezone.utc),
+            'pages': {1: 'a', 2: 'b'},
+            'nested': [{'day': date(2023, 1, 1)}, None],
+        }
+        field = Channel._meta.get_field('state').formfield()
+        self.assertEqual(field.clean(field.prepare_value(state)), state)
+
+    def test_form_invalid(self):
+        field = Channel._meta.get_field('state').formfield()
+        for value in ('{', '{"$set": [[1]]}'):
+            with self.assertRaises(ValidationError):
+                field.clean(value)
+
+
+class BackoffTestCase(SimpleTestCase):
+    def test_backoff(self):
+        base, cap = timedelta(seconds=10), timedelta(seconds=100)
+        for retries in range(10):
+            limit = min(100, 10 * 2 ** retries)
+            delays = [backoff(retries, base, cap) for _ in range(50)]
+            self.assertTrue(all(0 <= delay <= limit for delay in delays))
+            # NOTE: jittered, not the same delay every time.
+            self.assertGreater(len(set(delays)), 1)
+
+
+class HTTPError(Exception):
+    def __init__(self, status):
+        self.status = status
+
+
+# NOTE: a database of its own, flushed by the tests.
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': f'redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}/15',
+    }
+})
+class CircuitBreakerTestCase(SimpleTestCase):
+    def setUp(self):
+        self.redis = get_redis_connection('default')
+        self.redis.flushdb()
+        self.addCleanup(self.redis.flushdb)
+        self.breaker = CircuitBreaker(
+            'example.com', threshold=3, window=timedelta(minutes=10),
+            cooldown=timedelta(minutes=15))
+
+    def cool_down(self):
+        self.redis.delete(self.breaker.open_key)
+
+    def test_open(self):
+        self.assertFalse(self.breaker.failure(1))
+        self.assertFalse(self.breaker.failure(2))
+        self.assertTrue(self.breaker.allow())
+        self.assertTrue(self.breaker.failure(3))
+        self.assertFalse(self.breaker.allow())
+
+    def test_retries_count_once(self):
+        for _ in range(5):
+            self.assertFalse(self.breaker.failure(1))
+        self.assertTrue(self.breaker.allow())
+
+    def test_half_open_probe(self):
+        for channel_id in range(3):
+            self.breaker.failure(channel_id)
+        self.cool_down()
+        # NOTE: a single probe is let through.
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+
+    def test_close(self):
+        for channel_id in range(3):
+            self.breaker.failure(channel_id)
+        self.cool_down()
+        self.assertTrue(self.breaker.allow())
+        self.breaker.success()
+        self.assertTrue(self.breaker.allow())
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.failure(1))
+
+    def test_reopen(self):
+        for channel_id in range(3):
+            self.breaker.failure(channel_id)
+        self.cool_down()
+        self.assertTrue(self.breaker.allow())
+        self.assertTrue(self.breaker.failure(1))
+        self.assertFalse(self.breaker.allow())
+
+    def test_channel_error(self):
+        self.assertTrue(is_channel_error(HTTPError(404)))
+        self.assertFalse(is_channel_error(HTTPError(429)))
+        self.assertFalse(is_channel_error(HTTPError(503)))
+        self.assertFalse(is_channel_error(TimeoutError()))
@@ -0,0 +1,116 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from django_redis import get_redis_connection
+
+from rest.entitlements import LocalCache, LOCAL, subscribed_channel_ids
+from rest.models import User, Channel, Package, Subscription
+
+
+class LocalCacheTestCase(SimpleTestCase):
+    def test_lru(self):
+        cache = LocalCache(2, timedelta(minutes=1))
+        cache.set('a', [1])
+        cache.set('b', [2])
+        self.assertEqual(cache.get('a'), [1])
+        cache.set('c', [3])
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), [1])
+        self.assertEqual(cache.get('c'), [3])
+
+    def test_expiry(self):
+        cache = LocalCache(2, timedelta(minutes=1))
+        with mock.patch('rest.entitlements.time.monotonic', return_value=0):
+            cache.set('a', [1])
+        with mock.patch('rest.entitlements.time.monotonic', return_value=59):
+            self.assertEqual(cache.get('a'), [1])
+        with mock.patch('rest.entitlements.time.monotonic', return_value=61):
+            self.assertIsNone(cache.get('a'))
+
+
+# NOTE: a database of its own, flushed by the tests.
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': f'redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}/15',
+    }
+})
+class SubscribedChannelsTestCase(TestCase):
+    def setUp(self):
+        redis = get_redis_connection('default')
+        redis.flushdb()
+        self.addCleanup(redis.flushdb)
+        LOCAL.clear()
+        self.addCleanup(LOCAL.clear)
+
+        self.user = User.objects.create(
+            username='user', email='user@example.com', site_id=1)
+        self.public, self.private, self.other = [
+            Channel.objects.create(
+                user=self.user, extern_id=name, name=name,
+                url=f'https://example.com/{name}', is_public=name == 'public')
+            for name in ('public', 'private', 'other')
+        ]
+        self.package = Package.objects.create(user=self.user, name='package')
+        self.private.packages.add(self.package)
+
+    def visible(self):
+        return set(Channel.objects.for_user(self.user, annotated=False))
+
+    def test_subscribed(self):
+        self.assertEqual(subscribed_channel_ids(self.user), [])
+        self.assertEqual(self.visible(), {self.public})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Subscription.objects.create(user=self.user, package=self.package)
+        self.assertEqual(subscribed_channel_ids(self.user), [self.private.id])
+        self.assertEqual(self.visible(), {self.public, self.private})
+
+    def test_cached(self):
+        subscribed_channel_ids(self.user)
+        # NOTE: not invalidated, the cached set is still served.
+        Subscription.objects.create(user=self.user, package=self.package)
+        with self.assertNumQueries(0):
+            self.assertEqual(subscribed_channel_ids(self.user), [])
+
+    def test_subscription_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            subscription = Subscription.objects.create(
+                user=self.user, package=self.package)
+        self.assertEqual(subscribed_channel_ids(self.user), [self.private.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            subscription.delete()
+        self.assertEqual(subscribed_channel_ids(self.user), [])
+
+    def test_package_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Subscription.objects.create(user=self.user, package=self.package)
+        self.assertEqual(subscribed_channel_ids(self.user), [self.private.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other.packages.add(self.package)
+        self.assertEqual(
+            subscribed_channel_ids(self.user),
+            sorted([self.private.id, self.other.id]))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.package.channels.remove(self.private)
+        self.assertEqual(subscribed_channel_ids(self.user), [self.other.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.package.channels.clear()
+        self.assertEqual(subscribed_channel_ids(self.user), [])
+
+    def test_visibility_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Subscription.objects.create(user=self.user, package=self.package)
+        subscribed_channel_ids(self.user)
+
+        # NOTE: public channels are filtered on directly, nothing to retire.
+        self.other.is_public = True
+        self.other.save()
+        self.assertEqual(
+            self.visible(), {self.public, self.private, self.other})
@@ -0,0 +1,31 @@
+from django.test import SimpleTestCase
+
+from rest.extractors import RegexExtractor, MAX_NGRAM_LENGTH
+
+
+class RegexExtractorTestCase(SimpleTestCase):
+    def setUp(self):
+        self.extractor = RegexExtractor()
+
+    def extract(self, *texts):
+        return list(self.extractor.extract(texts))
+
+    def test_ngrams(self):
+        self.assertEqual(
+            self.extract('Supreme Court ruling'),
+            ['Supreme', 'Supreme Court', 'Supreme Court ruling', 'Court',
+             'Court ruling', 'ruling'])
+
+    def test_stopwords(self):
+        ngrams = self.extract('the history of Rome')
+        self.assertIn('history of Rome', ngrams)
+        self.assertNotIn('the history', ngrams)
+        self.assertNotIn('history of', ngrams)
+        self.assertNotIn('of', ngrams)
+
+    def test_punctuation(self):
+        self.assertNotIn('Linux Kernel', self.extract('Linux. Kernel'))
+        self.assertNotIn('2023', self.extract('Best of 2023'))
+
+    def test_length(self):
+        self.assertEqual(self.extract('x' * (MAX_NGRAM_LENGTH + 1)), [])
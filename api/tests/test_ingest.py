@@ -0,0 +1,141 @@
+from datetime import datetime, timezone
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from rest.backfill import backfill_channel
+from rest.tasks.video import crawl_channel
+from rest.models import (
+    User, Channel, Video, VideoSource, VideoMeta, Tag, fingerprint,
+    video_fingerprint,
+)
+from tests.fixtures import video_data
+
+
+class FingerprintTestCase(SimpleTestCase):
+    def test_fingerprint_key_order(self):
+        self.assertEqual(
+            fingerprint({'a': 1, 'b': [1, 2]}),
+            fingerprint({'b': [1, 2], 'a': 1}))
+
+    def test_fingerprint_naive_datetime(self):
+        naive = datetime(2022, 7, 22, 2, 45, 35)
+        aware = naive.replace(tzinfo=timezone.utc)
+        self.assertEqual(
+            fingerprint({'published': naive}),
+            fingerprint({'published': aware}))
+
+    def test_fingerprint_changes(self):
+        self.assertNotEqual(
+            fingerprint({'title': 'mtg member podcast 2022 show'}),
+            fingerprint({'title': 'mtg member podcast 2023 show'}))
+
+    def test_video_fingerprint(self):
+        data = video_data(0)
+        digest = video_fingerprint(data)
+        data.original = {'id': 0, 'view_count': 10}
+        data.sources[0].original = {'tbr': 1000}
+        self.assertEqual(video_fingerprint(data), digest)
+        data.sources[0].url = 'https://example.com/changed.mp4'
+        self.assertNotEqual(video_fingerprint(data), digest)
+
+
+class DirtyFieldsTestCase(SimpleTestCase):
+    def setUp(self):
+        self.channel = Channel.from_db(
+            'default', ['id', 'url', 'state', 'name'],
+            [1, 'https://rumble.com/c/test', {'page': 1}, 'test'])
+
+    def test_clean(self):
+        self.assertEqual(self.channel.get_dirty_fields(), [])
+
+    def test_changed(self):
+        self.channel.name = 'changed'
+        self.assertEqual(self.channel.get_dirty_fields(), ['name'])
+
+    def test_mutated(self):
+        self.channel.state['page'] = 2
+        self.assertEqual(self.channel.get_dirty_fields(), ['state'])
+
+
+class RefreshTestCase(TestCase):
+    def test_refresh_relation(self):
+        user = User.objects.create(
+            username='user', email='user@example.com', site_id=1)
+        channel = Channel.objects.create(
+            user=user, extern_id='channel', name='channel',
+            url='https://example.com/channel')
+        video, _ = Video.objects.from_dataclass(channel, video_data(0))
+        video.refresh_from_db(fields=['channel', 'tags'])
+        self.assertEqual(video.get_dirty_fields(), [])
+        video.channel_id = None
+        self.assertEqual(video.get_dirty_fields(), ['channel_id'])
+
+
+class BackfillTestCase(TestCase):
+    def setUp(self):
+        user = User.objects.create(
+            username='user', email='user@example.com', site_id=1)
+        self.channel = Channel.objects.create(
+            user=user, extern_id='channel', name='channel',
+            url='https://example.com/channel')
+
+    def test_backfill(self):
+        Video.objects.from_dataclass(self.channel, video_data(0))
+        progress = []
+        created, updated, unchanged = backfill_channel(self.channel, [
+            video_data(0), video_data(1, title='Changed'),
+            video_data(2, tags=('cats',)), video_data(1),
+        ], progress=lambda: progress.append(1))
+
+        self.assertEqual(len(created), 2)
+        self.assertEqual((updated, unchanged), ([], 1))
+        self.assertTrue(progress)
+        self.assertEqual(
+            sorted(self.channel.videos.values_list('extern_id', flat=True)),
+            ['video-0', 'video-1', 'video-2'])
+        # NOTE: the crawler yielded video-1 twice, the last copy wins.
+        self.assertEqual(
+            Video.objects.get(extern_id='video-1').title, 'Video 1')
+        self.assertEqual(VideoSource.objects.count(), 6)
+        self.assertEqual(VideoMeta.objects.count(), 3)
+        self.assertEqual(
+            list(Video.objects.get(extern_id='video-2')
+                 .tags.values_list('name', flat=True)),
+            ['cats'])
+        self.assertEqual(Tag.objects.get(name='cats').n_tagged, 3)
+        self.assertEqual(Tag.objects.get(name='dogs').n_tagged, 2)
+
+    def test_unchanged_sources(self):
+        data = video_data(0)
+        video, _ = Video.objects.from_dataclass(self.channel, data)
+        with self.assertNumQueries(1):
+            VideoSource.objects.from_dataclass(video, data.sources)
+
+        data.sources[0].width = 320
+        VideoSource.objects.from_dataclass(video, data.sources)
+        self.assertEqual(
+            sorted(video.sources.values_list('width', flat=True)),
+            [320, 1280])
+
+    def crawl(self):
+        task = mock.Mock(max_retries=3)
+        task.request.retries = 0
+        with mock.patch('rest.tasks.video.crawl_sync',
+                        return_value=(None, [video_data(1)])), \
+             mock.patch.object(Channel, 'from_dataclass'), \
+             mock.patch('rest.tasks.video.backfill_channel',
+                        return_value=([], [], 0)) as backfill:
+            crawl_channel(task, self.channel, mock.Mock(), mock.Mock())
+        return backfill.called
+
+    def test_backfill_new_channel(self):
+        self.assertTrue(self.crawl())
+
+    def test_backfill_existing_channel(self):
+        # NOTE: channels that predate crawled have it NULL, yet have videos.
+        Video.objects.from_dataclass(self.channel, video_data(0))
+        self.assertIsNone(self.channel.crawled)
+        self.assertFalse(self.crawl())
+        self.assertTrue(
+            self.channel.videos.filter(extern_id='video-1').exists())
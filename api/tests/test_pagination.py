@@ -0,0 +1,60 @@
+from datetime import datetime, timezone
+from urllib.parse import urlparse, parse_qs
+
+from django.db.models import Q
+from django.test import SimpleTestCase
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from rest.models import Video
+from rest.pagination import HybridPagination
+
+
+class View:
+    keyset_ordering = ('-published', '-id')
+
+
+class HybridPaginationTestCase(SimpleTestCase):
+    def setUp(self):
+        self.paginator = HybridPagination()
+
+    def request(self, query):
+        return Request(APIRequestFactory().get('/videos/', query))
+
+    def test_ordering(self):
+        queryset = Video.objects.all()
+        self.assertEqual(
+            self.paginator.get_ordering(queryset, View()),
+            ['-published', '-id'])
+        self.assertEqual(
+            self.paginator.get_ordering(queryset.order_by('n_plays'), View()),
+            ['n_plays', 'id'])
+        self.assertIsNone(self.paginator.get_ordering(
+            queryset.order_by('-channel__name'), View()))
+
+    def test_seek(self):
+        seek = self.paginator.seek(['-published', '-id'], ['2023-01-01', 5])
+        self.assertEqual(seek, Q(published__lte='2023-01-01') & (
+            Q(published__lt='2023-01-01')
+            | Q(published='2023-01-01', id__lt=5)))
+
+    def test_cursor(self):
+        published = datetime(2023, 1, 1, 0, 0, 0, 1234, tzinfo=timezone.utc)
+        self.paginator.ordering = ['-published', '-id']
+        self.paginator.request = self.request({'cursor': '', 'offset': 10})
+        url = self.paginator.encode_cursor(
+            self.paginator.position(Video(id=5, published=published)), True)
+        self.assertNotIn('offset=', url)
+
+        cursor = parse_qs(urlparse(url).query)['cursor'][0]
+        position, reverse = self.paginator.decode_cursor(
+            self.request({'cursor': cursor}))
+        self.assertEqual(position, [published.isoformat(), 5])
+        self.assertTrue(reverse)
+
+    def test_invalid_cursor(self):
+        self.paginator.ordering = ['-published', '-id']
+        for cursor in ('garbage', 'eyJwIjpbMV0sInIiOmZhbHNlfQ=='):
+            with self.assertRaises(NotFound):
+                self.paginator.decode_cursor(self.request({'cursor': cursor}))
@@ -45,6 +45,14 @@ elif [ "${CMD}" == "celery" ]; then
         ARGS="${ARGS} --gid=${CELERY_GID}"
     fi
 
+    if [ ! -z "${CELERY_QUEUES}" ]; then
+        ARGS="${ARGS} --queues=${CELERY_QUEUES}"
+    fi
+
+    if [ ! -z "${CELERY_CONCURRENCY}" ]; then
+        ARGS="${ARGS} --concurrency=${CELERY_CONCURRENCY}"
+    fi
+
     python manage.py celery -l ${DJANGO_LOG_LEVEL}${ARGS}
 
 elif [ "${CMD}" == "test" ]; then